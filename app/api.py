@@ -12,12 +12,17 @@ Endpoints:
 
 import json
 import logging
+import os
+import shutil
 import tempfile
 import zipfile
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, status, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
@@ -25,7 +30,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, ValidationError
 
 from config import get_settings
-from label_validator import LabelValidator
+from label_validator import LabelValidator, prefetch_images
 from auth import get_current_user
 from middleware import HostCheckMiddleware
 from job_manager import JobManager, JobStatus
@@ -45,6 +50,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ttb_api")
 
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Initialize job manager for async batch processing
 job_manager = JobManager()
 
@@ -202,8 +210,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to start cleanup task: {e}")
     
+    # Keep WAL checkpoints (and their fsync) off the enqueue path
+    verify_queue.start_checkpointer()
+    
     yield
     
+    verify_queue.stop_checkpointer()
+    
     # Shutdown cleanup task
     if cleanup_task:
         cleanup_task.cancel()
@@ -252,27 +265,66 @@ def get_correlation_id() -> str:
     return str(uuid.uuid4())
 
 
-async def save_upload_file(upload_file: UploadFile, destination: Path) -> None:
+# Distinct OCR timeouts whose validators (and Ollama clients) are kept alive;
+# the least recently used is dropped when clients ask for more
+_MAX_CACHED_VALIDATORS = 8
+
+
+def get_validator(timeout: int) -> LabelValidator:
+    """
+    Return the process-wide LabelValidator for an OCR timeout.
+    
+    The validator is keyed on the exact timeout requested, so the client's
+    value is always the one the Ollama client enforces. The shared
+    validator's OCR backend guards its own result cache and availability
+    state, so it is safe to use from several threads.
+    """
+    return _validator_for(timeout)
+
+
+@lru_cache(maxsize=_MAX_CACHED_VALIDATORS)
+def _validator_for(timeout: int) -> LabelValidator:
+    """Build the LabelValidator shared by every request using this timeout."""
+    return LabelValidator(timeout=timeout)
+
+
+async def save_upload_file(
+    upload_file: UploadFile,
+    destination: Path,
+    max_bytes: Optional[int] = None
+) -> None:
     """
-    Save uploaded file to destination path.
+    Stream uploaded file to destination path in fixed-size chunks.
     
     Args:
         upload_file: FastAPI UploadFile object
         destination: Path to save file
+        max_bytes: Reject the upload once it grows past this many bytes
         
     Raises:
-        HTTPException: If file write fails
+        HTTPException: If the file is too large (413) or the write fails
     """
+    total = 0
     try:
-        content = await upload_file.read()
         with open(destination, "wb") as f:
-            f.write(content)
+            while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if max_bytes is not None and total > max_bytes:
+                    break
+                f.write(chunk)
     except Exception as e:
         logger.error(f"Failed to save upload file: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save uploaded file: {str(e)}"
         )
+    
+    if max_bytes is not None and total > max_bytes:
+        destination.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Uploaded file too large (max: {max_bytes // (1024 * 1024)}MB)"
+        )
 
 
 def validate_image_file(upload_file: UploadFile, correlation_id: str) -> None:
@@ -386,23 +438,85 @@ async def extract_zip_file(
         List of image file paths
         
     Raises:
-        HTTPException: If ZIP is invalid or contains too many files
+        HTTPException: If ZIP is invalid, contains too many files, is too
+            large once uncompressed, or has a path outside temp_dir
     """
     zip_path = temp_dir / "batch.zip"
-    await save_upload_file(zip_file, zip_path)
+    # A full batch of maximum-size images is the largest legitimate ZIP
+    await save_upload_file(
+        zip_file, zip_path,
+        max_bytes=settings.max_file_size_bytes * settings.max_batch_size
+    )
+    
+    image_extensions = ('.jpg', '.jpeg', '.tif', '.tiff')
+    # A full batch of maximum-size images is also the largest legitimate
+    # uncompressed total; declared sizes are enforced while decompressing
+    max_total_bytes = settings.max_file_size_bytes * settings.max_batch_size
+    root = temp_dir.resolve()
     
     try:
         with zipfile.ZipFile(zip_path, 'r') as zf:
+            infos = zf.infolist()
             # Check for zip bombs or too many files
-            if len(zf.namelist()) > settings.max_batch_size * 2:  # Allow JSON files too
+            if len(infos) > settings.max_batch_size * 2:  # Allow JSON files too
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"ZIP file contains too many files (max: {settings.max_batch_size * 2})"
                 )
             
-            # Extract all files
-            zf.extractall(temp_dir)
+            # Only images and their ground truth JSON are extracted
+            members = [
+                info for info in infos
+                if not info.is_dir() and info.filename.endswith(image_extensions + ('.json',))
+            ]
+            image_count = sum(1 for info in members if info.filename.endswith(image_extensions))
+            
+            if not image_count:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="No image files found in ZIP archive"
+                )
+            
+            if image_count > settings.max_batch_size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Too many images in batch. Maximum: {settings.max_batch_size}, found: {image_count}"
+                )
+            
+            # Stream each member to disk, checking sizes and paths first
+            image_files = []
+            total_bytes = 0
+            
+            for info in members:
+                if info.file_size > settings.max_file_size_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File in ZIP too large: {info.filename} (max: {settings.max_file_size_mb}MB)"
+                    )
+                total_bytes += info.file_size
+                if total_bytes > max_total_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"ZIP contents too large (max: {max_total_bytes // (1024 * 1024)}MB uncompressed)"
+                    )
+                
+                dest = (root / info.filename).resolve()
+                if not dest.is_relative_to(root):
+                    logger.warning(f"[{correlation_id}] Unsafe path in ZIP: {info.filename}")
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Invalid file path in ZIP archive: {info.filename}"
+                    )
+                
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src, open(dest, "wb") as dst:
+                    shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+                
+                if info.filename.endswith(image_extensions):
+                    image_files.append(dest)
     
+    except HTTPException:
+        raise
     except zipfile.BadZipFile:
         logger.warning(f"[{correlation_id}] Invalid ZIP file")
         raise HTTPException(
@@ -416,25 +530,6 @@ async def extract_zip_file(
             detail=f"Failed to extract ZIP file: {str(e)}"
         )
     
-    # Find all image files
-    image_extensions = {'.jpg', '.jpeg', '.tif', '.tiff'}
-    image_files = []
-    
-    for ext in image_extensions:
-        image_files.extend(temp_dir.glob(f"**/*{ext}"))
-    
-    if not image_files:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No image files found in ZIP archive"
-        )
-    
-    if len(image_files) > settings.max_batch_size:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Too many images in batch. Maximum: {settings.max_batch_size}, found: {len(image_files)}"
-        )
-    
     return sorted(image_files)
 
 
@@ -473,6 +568,86 @@ async def _cleanup_jobs_loop():
             logger.error(f"Error in cleanup task: {e}", exc_info=True)
 
 
+def _process_batch_image(
+    validator: LabelValidator,
+    image_path: Path,
+    index: int,
+    total: int,
+    correlation_id: str,
+    image_bytes: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """
+    Validate one image of a batch job.
+    
+    Errors are returned as an ERROR result rather than raised, so one bad
+    image does not stop the rest of the batch.
+    
+    Args:
+        validator: Validator shared by the whole batch
+        image_path: Path to the image file
+        index: 1-based position of the image in the batch (for logging)
+        total: Number of images in the batch (for logging)
+        correlation_id: Request correlation ID
+        image_bytes: Image contents if already read (e.g. via prefetch_images)
+        
+    Returns:
+        Validation result with image_path set to the file name
+    """
+    try:
+        logger.info(
+            f"[{correlation_id}] [{index}/{total}] "
+            f"Processing {image_path.name}"
+        )
+        
+        # Look for ground truth JSON
+        ground_truth_path = find_ground_truth_file(image_path)
+        ground_truth_data = None
+        
+        if ground_truth_path:
+            try:
+                with open(ground_truth_path, 'r') as f:
+                    ground_truth_data = json.load(f)
+                
+                # Handle nested ground_truth key
+                if 'ground_truth' in ground_truth_data:
+                    ground_truth_data = ground_truth_data['ground_truth']
+            
+            except Exception as e:
+                logger.warning(
+                    f"[{correlation_id}] Failed to load ground truth for "
+                    f"{image_path.name}: {e}"
+                )
+        
+        # Validate label
+        result = validator.validate_label(
+            str(image_path), ground_truth_data, image_bytes=image_bytes
+        )
+        result['image_path'] = image_path.name
+        
+        logger.debug(
+            f"[{correlation_id}] [{index}/{total}] "
+            f"Completed {image_path.name} - Status: {result['status']}"
+        )
+        return result
+    
+    except Exception as e:
+        logger.error(
+            f"[{correlation_id}] Failed to process {image_path.name}: {e}",
+            exc_info=True
+        )
+        return {
+            "status": "ERROR",
+            "validation_level": "STRUCTURAL_ONLY",
+            "extracted_fields": {},
+            "validation_results": {"structural": [], "accuracy": []},
+            "violations": [],
+            "warnings": [],
+            "processing_time_seconds": 0.0,
+            "image_path": image_path.name,
+            "error": str(e)
+        }
+
+
 def process_batch_job(
     job_id: str,
     image_files: List[Path],
@@ -482,7 +657,10 @@ def process_batch_job(
     """
     Background task to process a batch job.
     
-    Processes images sequentially, updating job state after each image.
+    Processes up to settings.batch_max_concurrency images concurrently.
+    At the default of one, images run sequentially with the next image read
+    from disk while the current one is in OCR. Job state is updated after
+    each image, in input order.
     Continues on error to return partial results.
     
     Args:
@@ -497,9 +675,9 @@ def process_batch_job(
         # Update job status to PROCESSING
         job_manager.update_job(job_id, status=JobStatus.PROCESSING)
         
-        # Initialize validator with Ollama (reuse for all images)
+        # Shared validator for this timeout (reused for all images)
         try:
-            validator = LabelValidator(timeout=ocr_timeout)
+            validator = get_validator(ocr_timeout)
         
         except RuntimeError as e:
             # Handle Ollama unavailability
@@ -512,66 +690,30 @@ def process_batch_job(
             )
             return
         
-        # Process each image sequentially
-        total_time = 0.0
+        started_at = time.monotonic()
+        process_one = partial(
+            _process_batch_image, validator,
+            total=len(image_files), correlation_id=correlation_id
+        )
         
-        for i, image_path in enumerate(image_files, 1):
-            try:
-                logger.info(
-                    f"[{correlation_id}] [{i}/{len(image_files)}] "
-                    f"Processing {image_path.name}"
-                )
-                
-                # Look for ground truth JSON
-                ground_truth_path = find_ground_truth_file(image_path)
-                ground_truth_data = None
-                
-                if ground_truth_path:
-                    try:
-                        with open(ground_truth_path, 'r') as f:
-                            ground_truth_data = json.load(f)
-                        
-                        # Handle nested ground_truth key
-                        if 'ground_truth' in ground_truth_data:
-                            ground_truth_data = ground_truth_data['ground_truth']
-                    
-                    except Exception as e:
-                        logger.warning(
-                            f"[{correlation_id}] Failed to load ground truth for "
-                            f"{image_path.name}: {e}"
-                        )
-                
-                # Validate label
-                result = validator.validate_label(str(image_path), ground_truth_data)
-                result['image_path'] = image_path.name
-                
-                # Append result to job (atomic operation)
+        if settings.batch_max_concurrency > 1:
+            # Validate up to batch_max_concurrency images at once; map() yields
+            # results in input order so the job's result list stays sorted
+            with ThreadPoolExecutor(max_workers=settings.batch_max_concurrency,
+                                    thread_name_prefix="batch-validate") as pool:
+                for result in pool.map(process_one, image_files, range(1, len(image_files) + 1)):
+                    # Append result to job (atomic operation)
+                    job_manager.append_result(job_id, result)
+        else:
+            # Sequential: the next image is read from disk while the current
+            # one is in OCR
+            for i, (image_path, image_bytes) in enumerate(prefetch_images(image_files), 1):
+                result = process_one(image_path, i, image_bytes=image_bytes)
                 job_manager.append_result(job_id, result)
-                total_time += result['processing_time_seconds']
-                
-                logger.debug(
-                    f"[{correlation_id}] [{i}/{len(image_files)}] "
-                    f"Completed {image_path.name} - Status: {result['status']}"
-                )
-            
-            except Exception as e:
-                logger.error(
-                    f"[{correlation_id}] Failed to process {image_path.name}: {e}",
-                    exc_info=True
-                )
-                # Add error result and continue processing
-                error_result = {
-                    "status": "ERROR",
-                    "validation_level": "STRUCTURAL_ONLY",
-                    "extracted_fields": {},
-                    "validation_results": {"structural": [], "accuracy": []},
-                    "violations": [],
-                    "warnings": [],
-                    "processing_time_seconds": 0.0,
-                    "image_path": image_path.name,
-                    "error": str(e)
-                }
-                job_manager.append_result(job_id, error_result)
+        
+        # Wall-clock time for the whole batch (per-image times overlap when
+        # images run concurrently, so summing them would overstate it)
+        total_time = time.monotonic() - started_at
         
         # Get final job state to calculate summary
         job = job_manager.get_job(job_id)
@@ -674,9 +816,9 @@ async def verify_label(
         await save_upload_file(image, temp_path)
         
         try:
-            # Initialize validator with Ollama, passing timeout at construction
-            # so the httpx client inside OllamaOCR enforces it on every request.
-            validator = LabelValidator(timeout=ocr_timeout)
+            # Shared validator for this timeout; the httpx client inside
+            # OllamaOCR enforces the timeout on every request.
+            validator = get_validator(ocr_timeout)
             
             # Validate label
             logger.info(
@@ -1029,7 +1171,9 @@ async def get_async_verify_status(
     ```
     """
     correlation_id = get_correlation_id()
-    job = verify_queue.get(job_id)
+    # Polls only need the status columns; fetch the full row (with the
+    # decoded result) once the job has completed.
+    job = verify_queue.get_status(job_id)
 
     if job is None:
         raise HTTPException(
@@ -1038,6 +1182,8 @@ async def get_async_verify_status(
         )
 
     result_obj: Optional[VerifyResponse] = None
+    if job["status"] == "completed":
+        job = verify_queue.get(job_id) or job
     if job["status"] == "completed" and job.get("result"):
         try:
             result_obj = VerifyResponse(**job["result"])
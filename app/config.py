@@ -43,6 +43,15 @@ class Settings(BaseSettings):
         default=50,
         description="Maximum number of images in a batch request"
     )
+    batch_max_concurrency: int = Field(
+        default=1,
+        description=(
+            "Maximum images validated concurrently within one batch job. Raise only "
+            "when Ollama runs with OLLAMA_NUM_PARALLEL>1 and a model that serves "
+            "parallel requests; llama3.2-vision (mllama) runs one at a time, so "
+            "extra images just wait and eat into their OCR timeout"
+        )
+    )
     
     # Job Management Configuration
     job_retention_hours: int = Field(
@@ -112,6 +121,14 @@ class Settings(BaseSettings):
             raise ValueError("max_batch_size should not exceed 500 for practical use")
         return v
     
+    @field_validator("batch_max_concurrency")
+    @classmethod
+    def validate_batch_max_concurrency(cls, v: int) -> int:
+        """Ensure batch concurrency is positive."""
+        if v <= 0:
+            raise ValueError("batch_max_concurrency must be positive")
+        return v
+    
     @field_validator("job_retention_hours")
     @classmethod
     def validate_job_retention_hours(cls, v: int) -> int:
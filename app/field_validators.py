@@ -298,11 +298,22 @@ class FieldValidator:
                 except (ValueError, AttributeError):
                     extracted_abv = None
             
-            result = self.validate_abv(
-                extracted_abv,
-                float(ground_truth["abv"]),
-                ground_truth.get("product_type", "wine")
-            )
+            try:
+                expected_abv = float(ground_truth["abv"])
+            except (TypeError, ValueError):
+                result = ValidationResult(
+                    field_name="abv",
+                    is_valid=False,
+                    expected=str(ground_truth["abv"]),
+                    actual=None if extracted_abv is None else f"{extracted_abv}%",
+                    error_message="Expected ABV is not a number"
+                )
+            else:
+                result = self.validate_abv(
+                    extracted_abv,
+                    expected_abv,
+                    ground_truth.get("product_type", "wine")
+                )
             results.append(result)
         
         # Validate net contents
@@ -10,27 +10,95 @@ Outputs unified JSON format for CLI and API.
 
 import os
 import time
-from typing import Dict, Any, Optional, List
-from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator, Sequence, Tuple
+from enum import StrEnum
 
 from ocr_backends import OCRBackend, OllamaOCR
 from label_extractor import LabelExtractor, GOVERNMENT_WARNING_TEXT
-from field_validators import FieldValidator
+from field_validators import FieldValidator, ValidationResult
 
+# Shared read-only fallback for absent nested dicts (never mutated)
+_EMPTY: Dict[str, Any] = {}
 
-class ValidationStatus(Enum):
-    """Overall validation status."""
+# Core fields whose absence suggests poor OCR quality
+_CORE_FIELDS = frozenset({"brand_name", "abv", "net_contents", "bottler"})
+
+
+class ValidationStatus(StrEnum):
+    """Overall validation status (members are plain JSON-ready strings)."""
     COMPLIANT = "COMPLIANT"
     NON_COMPLIANT = "NON_COMPLIANT"
     PARTIAL_VALIDATION = "PARTIAL_VALIDATION"
 
 
-class ValidationLevel(Enum):
-    """Level of validation performed."""
+class ValidationLevel(StrEnum):
+    """Level of validation performed (members are plain JSON-ready strings)."""
     STRUCTURAL_ONLY = "STRUCTURAL_ONLY"  # Tier 1 only
     FULL_VALIDATION = "FULL_VALIDATION"  # Tier 1 + Tier 2
 
 
+def _read_image_bytes(image_path: Path) -> Optional[bytes]:
+    """Read an image file, returning None if it cannot be read."""
+    try:
+        return image_path.read_bytes()
+    except OSError:
+        return None
+
+
+def prefetch_images(image_files: Sequence[Path]) -> Iterator[Tuple[Path, Optional[bytes]]]:
+    """
+    Yield (path, image_bytes) pairs for a batch of images.
+    
+    The next image is read on a background thread while the caller is still
+    processing the current one, so disk reads overlap OCR inference instead
+    of queueing behind it. At most one read is in flight, which keeps memory
+    bounded to two images regardless of batch size.
+    
+    image_bytes is None when the file could not be read; pass it through to
+    validate_label, which then reports the missing image as an ERROR result.
+    """
+    if not image_files:
+        return
+    
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-prefetch") as pool:
+        pending = pool.submit(_read_image_bytes, Path(image_files[0]))
+        for i, image_path in enumerate(image_files):
+            image_bytes = pending.result()
+            if i + 1 < len(image_files):
+                pending = pool.submit(_read_image_bytes, Path(image_files[i + 1]))
+            yield image_path, image_bytes
+
+
+def _normalize_ground_truth(ground_truth: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Canonicalize ground truth once so every downstream check sees the same values.
+    
+    String values are stripped of surrounding whitespace and ``abv`` is coerced
+    to a float (accepting forms like "7.5" or "7.5%"). Case is preserved because
+    expected values are echoed back in validation results; fuzzy matching is
+    already case-insensitive. Returns a new dict (the caller's is untouched), or
+    None when no ground truth was given.
+    """
+    if not ground_truth:
+        return None
+    
+    normalized = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in ground_truth.items()
+    }
+    
+    abv = normalized.get('abv')
+    if isinstance(abv, str):
+        try:
+            normalized['abv'] = float(abv.rstrip('%'))
+        except ValueError:
+            pass  # Leave as-is; validate_all_fields reports it as a failed field
+    
+    return normalized
+
+
 class LabelValidator:
     """Main validator orchestrating OCR, extraction, and validation."""
     
@@ -52,7 +120,8 @@ class LabelValidator:
     
     def validate_label(self,
                       image_path: str,
-                      ground_truth: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                      ground_truth: Optional[Dict[str, Any]] = None,
+                      image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
         """
         Validate a label image.
         
@@ -66,6 +135,8 @@ class LabelValidator:
                     "bottler": str,
                     "product_type": str (wine/spirits/beer/malt)
                 }
+            image_bytes: Optional contents of image_path, if the caller has
+                already read them (e.g. via prefetch_images)
         
         Returns:
             JSON-serializable dictionary with validation results:
@@ -82,24 +153,39 @@ class LabelValidator:
                 "processing_time_seconds": float
             }
         """
-        start_time = time.time()
+        # Monotonic clock: immune to wall-clock jumps, cheap to read
+        start_time = time.perf_counter()
+        
+        ground_truth = _normalize_ground_truth(ground_truth)
+        
+        # Read the image once and hand the bytes to the OCR backend so it
+        # does not have to re-open the file by path.
+        if image_bytes is None:
+            image_bytes = _read_image_bytes(Path(image_path))
         
         # Step 1: OCR
-        ocr_result = self.ocr.extract_text(image_path)
+        if image_bytes is None:
+            ocr_result = {
+                'success': False,
+                'error': f"Image not found: {image_path}"
+            }
+        else:
+            ocr_result = self.ocr.extract_text(image_bytes)
         
         # Check if OCR was successful
         if not ocr_result.get('success', False):
             return {
                 "status": "ERROR",
                 "error": ocr_result.get('error', 'OCR extraction failed'),
-                "validation_level": "STRUCTURAL_ONLY",
+                "connection_error": ocr_result.get('connection_error', False),
+                "validation_level": ValidationLevel.STRUCTURAL_ONLY,
                 "extracted_fields": {},
                 "validation_results": {
                     "structural": [],
                     "accuracy": []
                 },
                 "violations": [],
-                "processing_time_seconds": round(time.time() - start_time, 3)
+                "processing_time_seconds": round(time.perf_counter() - start_time, 3)
             }
         
         raw_text = ocr_result['raw_text']
@@ -120,16 +206,13 @@ class LabelValidator:
         
         # Step 5: Determine overall status
         violations = self._collect_violations(structural_results, accuracy_results)
-        warnings = self._collect_warnings(extracted_fields, ground_truth)
+        warnings = self._collect_warnings(structural_results, ground_truth)
         status = self._determine_status(violations, ground_truth)
         
-        # Calculate processing time
-        processing_time = time.time() - start_time
-        
         # Build response
         return {
-            "status": status.value,
-            "validation_level": validation_level.value,
+            "status": status,
+            "validation_level": validation_level,
             "extracted_fields": self._format_extracted_fields(extracted_fields),
             "validation_results": {
                 "structural": [r.to_dict() for r in structural_results],
@@ -137,7 +220,7 @@ class LabelValidator:
             },
             "violations": violations,
             "warnings": warnings,
-            "processing_time_seconds": round(processing_time, 3)
+            "processing_time_seconds": round(time.perf_counter() - start_time, 3)
         }
     
     def _validate_structural(self, extracted_fields: Dict[str, Any]) -> List[Any]:
@@ -146,8 +229,6 @@ class LabelValidator:
         
         Returns list of validation result objects.
         """
-        from field_validators import ValidationResult
-        
         results = []
         
         # Check brand name presence
@@ -223,7 +304,7 @@ class LabelValidator:
             ))
         
         # Check government warning
-        warning = extracted_fields.get('government_warning', {})
+        warning = extracted_fields.get('government_warning') or _EMPTY
         
         if not warning.get('present'):
             results.append(ValidationResult(
@@ -320,7 +401,7 @@ class LabelValidator:
         return violations
     
     def _collect_warnings(self,
-                         extracted_fields: Dict[str, Any],
+                         structural_results: List[Any],
                          ground_truth: Optional[Dict[str, Any]]) -> List[str]:
         """Collect warnings about validation limitations."""
         warnings = []
@@ -332,16 +413,12 @@ class LabelValidator:
                 "Provide ground truth data to enable full accuracy validation."
             )
         
-        # Warn about OCR quality if fields missing
-        missing_count = 0
-        if not extracted_fields.get('brand_name'):
-            missing_count += 1
-        if extracted_fields.get('alcohol_content_numeric') is None:
-            missing_count += 1
-        if not extracted_fields.get('net_contents'):
-            missing_count += 1
-        if not extracted_fields.get('bottler_info'):
-            missing_count += 1
+        # Warn about OCR quality if fields missing (reuses the Tier 1
+        # presence checks rather than re-reading extracted fields)
+        missing_count = sum(
+            1 for r in structural_results
+            if r.field_name in _CORE_FIELDS and not r.is_valid
+        )
         
         if missing_count >= 2:
             warnings.append(
@@ -371,6 +448,7 @@ class LabelValidator:
     
     def _format_extracted_fields(self, extracted_fields: Dict[str, Any]) -> Dict[str, Any]:
         """Format extracted fields for JSON output."""
+        warning = extracted_fields.get('government_warning') or _EMPTY
         return {
             "brand_name": extracted_fields.get('brand_name'),
             "product_type": extracted_fields.get('class_type'),
@@ -380,9 +458,9 @@ class LabelValidator:
             "bottler": extracted_fields.get('bottler_info'),
             "country": extracted_fields.get('country_of_origin'),
             "government_warning": {
-                "present": extracted_fields.get('government_warning', {}).get('present', False),
-                "header_correct": extracted_fields.get('government_warning', {}).get('header_all_caps'),
-                "text_correct": extracted_fields.get('government_warning', {}).get('text_matches')
+                "present": warning.get('present', False),
+                "header_correct": warning.get('header_all_caps'),
+                "text_correct": warning.get('text_matches')
             }
         }
 
@@ -5,22 +5,122 @@ Provides OCR extraction using Ollama vision models (llama3.2-vision, llava)
 for accurate text extraction from alcohol beverage labels.
 """
 
+import hashlib
+import io
+import logging
+import os
+import threading
 import time
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib json parser
+    orjson = None
+
+try:
+    import httpx
+    # Transport-level failures talking to Ollama (timeouts, refused or dropped
+    # connections). ollama re-raises httpx.ConnectError as ConnectionError.
+    _CONNECTION_ERRORS = (httpx.TransportError, ConnectionError)
+except ImportError:  # httpx ships with ollama; only missing if ollama is too
+    _CONNECTION_ERRORS = (ConnectionError,)
+
+logger = logging.getLogger(__name__)
+
+
+# Prompt for structured extraction. Sent as the system message so the text is
+# an identical prefix on every call and Ollama can reuse its KV cache
+# (the model stays loaded with keep_alive=-1).
+_OCR_PROMPT = """Extract ALL text from this alcohol beverage label image EXACTLY as it appears.
+
+CRITICAL: Preserve the EXACT capitalization, spacing, and formatting of all text. Do not normalize or change the case of any words.
+
+Please extract and list every piece of text you can see, line by line. Include:
+- Brand name (EXACT case)
+- Product type/class (e.g., "Bourbon Whiskey", "Pinot Noir", "IPA")
+- Alcohol content (e.g., "13.5% alc./vol.", "40% ABV", "80 Proof")
+- Net contents/volume (e.g., "750 mL", "12 fl oz")
+- Bottler/producer information (e.g., "Bottled by...", "Imported by...", "Produced by...")
+- Country of origin (e.g., "Product of France")
+- Government warning text (preserve EXACT capitalization - if it says "GOVERNMENT WARNING:" in all caps, write it that way)
+- Any other text visible on the label
+
+Format your response as plain text, with each distinct text element on its own line. Do NOT add bullet points, asterisks, or markdown formatting."""
+
+# Per-image user message accompanying the attached image
+_OCR_USER_PROMPT = "Extract all text from the attached label image."
+
+# Low temperature for consistent extraction
+_OCR_OPTIONS = {'temperature': 0.1}
+
+# Part of the OCR result cache key, so editing the prompt invalidates cached results
+_PROMPT_HASH = hashlib.sha256(f"{_OCR_PROMPT}\0{_OCR_USER_PROMPT}".encode()).hexdigest()
+
+# Maximum OCR results kept per backend instance (oldest evicted first)
+_RESULT_CACHE_SIZE = 256
+
+# Longest image side sent to the model. llama3.2-vision tiles inputs into at
+# most 2x2 tiles of 560px, so larger images only cost upload and decode time.
+_MAX_IMAGE_SIDE = 1120
+
+# Written by the host cron once the model is resident in GPU memory
+_SENTINEL_PATH = Path("/etc/ollama_health/HEALTHY")
+
+# How long an availability check result is trusted before re-checking
+_AVAILABILITY_TTL_SECONDS = 30.0
+
+
+@lru_cache(maxsize=8)
+def _load_image_bytes(path: str, mtime_ns: int, size: int) -> bytes:
+    """
+    Read an image file, caching the bytes for repeat OCR of the same file.
+
+    mtime_ns and size are part of the cache key only, so a file that is
+    rewritten in place is re-read rather than served stale.
+    """
+    return Path(path).read_bytes()
+
+
+def _downscale_image(image_data: bytes) -> bytes:
+    """
+    Shrink an image whose longest side exceeds _MAX_IMAGE_SIDE.
+
+    Images already within bounds, or that Pillow cannot read, are returned
+    unchanged so Ollama sees exactly what the caller sent.
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            if max(img.size) <= _MAX_IMAGE_SIDE:
+                return image_data
+            # JPEG only: decode at a reduced scale that is still >= the target
+            img.draft('RGB', (_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE))
+            resized = img.convert('RGB')
+        resized.thumbnail((_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        resized.save(out, format='JPEG', quality=85)
+        return out.getvalue()
+    except OSError:
+        return image_data
 
 
 class OCRBackend(ABC):
     """Abstract base class for OCR backends."""
     
     @abstractmethod
-    def extract_text(self, image_path: str) -> Dict[str, Any]:
+    def extract_text(self, image: Union[bytes, str]) -> Dict[str, Any]:
         """
         Extract text from image.
         
         Args:
-            image_path: Path to image file
+            image: Raw image bytes, or path to image file
             
         Returns:
             {
@@ -30,9 +130,11 @@ class OCRBackend(ABC):
                     'backend': str,
                     'model': str (if applicable),
                     'processing_time_seconds': float,
-                    'confidence': float (0-1, if available)
+                    'confidence': float (0-1, if available),
+                    'cache_hit': bool (True if served from a result cache)
                 },
-                'error': str (if success=False)
+                'error': str (if success=False),
+                'connection_error': bool (if success=False)
             }
         """
         pass
@@ -42,7 +144,7 @@ class OllamaOCR(OCRBackend):
     """OCR backend using Ollama vision models with lazy initialization."""
     
     def __init__(self, model: str = "llama3.2-vision", host: str = "http://localhost:11434",
-                 timeout: int = 60):
+                 timeout: int = 60, use_cache: bool = True, warmup: bool = False):
         """
         Initialize Ollama OCR backend.
         
@@ -54,13 +156,29 @@ class OllamaOCR(OCRBackend):
             model: Ollama model name (llama3.2-vision, llava, moondream)
             host: Ollama API host URL
             timeout: Request timeout in seconds passed to the ollama httpx client
+            use_cache: Reuse successful results for identical image bytes
+            warmup: Load the model in a background thread so the first
+                    extract_text() call does not pay the cold-load cost
         """
         self.model = model
+        self._model_base = model.split(':', 1)[0]
         self.host = host
         self.timeout = timeout
         self._availability_checked = False
         self._is_available = False
         self._availability_error = None
+        self._availability_expires_at = 0.0
+        self._availability_ttl = _AVAILABILITY_TTL_SECONDS
+        self.use_cache = use_cache
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        # One backend is shared by concurrent requests and batch threads;
+        # guards the result cache and the availability state
+        self._lock = threading.Lock()
+        
+        # Persistent HTTP session for availability probes so repeated checks
+        # reuse a pooled keep-alive connection instead of reconnecting.
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0))
         
         # Import ollama library and create a client with the configured timeout.
         # The module-level ollama.chat() has no timeout parameter; the Client
@@ -72,6 +190,18 @@ class OllamaOCR(OCRBackend):
         except ImportError:
             self._is_available = False
             self._availability_error = "ollama Python library not installed. Install with: pip install ollama"
+        
+        if warmup:
+            threading.Thread(target=self._warmup, name="ollama-warmup", daemon=True).start()
+    
+    def _warmup(self) -> None:
+        """Send a one-token request so the model is resident before real traffic."""
+        try:
+            self._ensure_available()
+            self._client.generate(model=self.model, prompt='hi', keep_alive=-1,
+                                  options={'num_predict': 1})
+        except Exception as e:
+            logger.info(f"Ollama warmup skipped: {e}")
     
     def check_availability(self) -> tuple[bool, Optional[str]]:
         """
@@ -80,21 +210,19 @@ class OllamaOCR(OCRBackend):
         Returns:
             (is_available, error_message) tuple
         """
-        import requests
-        
         try:
             # Check if Ollama service is running via HTTP API
-            response = requests.get(f"{self.host}/api/tags", timeout=5)
+            response = self._session.get(f"{self.host}/api/tags", timeout=5)
             
             if response.status_code != 200:
                 return False, f"Ollama not available: HTTP {response.status_code}"
             
             # Check if requested model is downloaded
-            models_data = response.json()
-            available_models = [m.get('name', '').split(':')[0] for m in models_data.get('models', [])]
-            model_base = self.model.split(':')[0]
+            models_data = orjson.loads(response.content) if orjson else response.json()
+            models = models_data.get('models', [])
             
-            if model_base not in available_models:
+            if not any(m.get('name', '').split(':', 1)[0] == self._model_base for m in models):
+                available_models = [m.get('name', '').split(':', 1)[0] for m in models]
                 return False, (
                     f"Model '{self.model}' not found. "
                     f"Available models: {', '.join(available_models) if available_models else 'none'}"
@@ -104,6 +232,23 @@ class OllamaOCR(OCRBackend):
                 
         except requests.exceptions.RequestException as e:
             return False, f"Cannot connect to Ollama at {self.host}: {str(e)}"
+        except ValueError as e:
+            return False, f"Invalid response from Ollama at {self.host}: {str(e)}"
+    
+    def close(self) -> None:
+        """Release pooled HTTP connections held by this backend."""
+        self._session.close()
+    
+    def reset_client(self) -> None:
+        """
+        Replace the Ollama client with one on a fresh connection pool.
+        
+        Call after a transport failure (see 'connection_error' in the
+        extract_text() result) so stale keep-alive connections are dropped.
+        """
+        if not hasattr(self, 'ollama'):
+            return
+        self._client = self.ollama.Client(host=self.host, timeout=self.timeout)
     
     def _ensure_available(self):
         """
@@ -112,103 +257,150 @@ class OllamaOCR(OCRBackend):
         Uses the sentinel file /etc/ollama_health/HEALTHY rather than a live
         HTTP call to Ollama. This keeps the verify path consistent with the
         /health endpoint and avoids a second independent availability check
-        that could disagree with the cron-managed health state.
+        that could disagree with the cron-managed health state. The result
+        is reused for _availability_ttl seconds so bursts of calls share one
+        check while restarts are still noticed.
 
         Raises:
             RuntimeError: If the sentinel file is absent (model not in GPU)
         """
-        from pathlib import Path
-        sentinel = Path("/etc/ollama_health/HEALTHY")
-        if not sentinel.exists():
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._availability_expires_at:
+                self._is_available = _SENTINEL_PATH.exists()
+                self._availability_checked = True
+                self._availability_expires_at = now + self._availability_ttl
+            is_available = self._is_available
+        if not is_available:
             raise RuntimeError(
                 "Ollama model not ready (sentinel /etc/ollama_health/HEALTHY absent — "
                 "cron pre-warm pending)"
             )
     
-    def extract_text(self, image_path: str) -> Dict[str, Any]:
-        """Extract text using Ollama vision model."""
+    def _read_image(self, image: Union[bytes, str]) -> Optional[bytes]:
+        """Return image bytes from raw bytes or a path, or None if the path is missing."""
+        if isinstance(image, (bytes, bytearray)):
+            return bytes(image)
+        # One stat serves as both the existence check and the byte-cache key
+        try:
+            st = os.stat(image)
+        except FileNotFoundError:
+            return None
+        return _load_image_bytes(str(image), st.st_mtime_ns, st.st_size)
+    
+    def _cache_key(self, image_data: bytes) -> Optional[str]:
+        """
+        Result cache key for an image, or None when caching is disabled.
+
+        Identical image + model + prompt always gets the same extraction,
+        so retries and re-scoring skip the multi-second inference.
+        """
+        if not self.use_cache:
+            return None
+        return f"{hashlib.sha256(image_data).hexdigest()}:{self.model}:{_PROMPT_HASH}"
+    
+    def _chat_kwargs(self, image_data: bytes) -> Dict[str, Any]:
+        """Arguments for a chat() call."""
+        return {
+            'model': self.model,
+            'messages': [
+                {'role': 'system', 'content': _OCR_PROMPT},
+                {'role': 'user', 'content': _OCR_USER_PROMPT, 'images': [image_data]}
+            ],
+            'options': _OCR_OPTIONS,
+            'keep_alive': -1  # Keep model loaded indefinitely to avoid 60s+ reload times
+        }
+    
+    def _meta(self, start_time: float, confidence: Optional[float] = None) -> Dict[str, Any]:
+        """Result metadata for a call that started at start_time."""
+        meta = {
+            'backend': 'ollama',
+            'model': self.model,
+            'processing_time_seconds': time.time() - start_time
+        }
+        if confidence is not None:
+            meta['confidence'] = confidence
+        return meta
+    
+    def _error(self, message: str, start_time: float,
+               connection_error: bool = False) -> Dict[str, Any]:
+        """
+        Failure result with metadata.
+
+        connection_error marks transport failures (timeouts, dropped
+        connections) so callers can rebuild the client before retrying.
+        """
+        return {
+            'success': False,
+            'error': message,
+            'connection_error': connection_error,
+            'metadata': self._meta(start_time)
+        }
+    
+    def _build_result(self, response, start_time: float, cache_key: Optional[str]) -> Dict[str, Any]:
+        """Turn a chat() response into a success result and cache it."""
+        extracted_text = response['message']['content'].strip()
+        
+        result = {
+            'success': True,
+            'raw_text': extracted_text,
+            'metadata': self._meta(start_time, confidence=0.85)  # Ollama doesn't provide confidence, use estimate
+        }
+        if cache_key is not None:
+            with self._lock:
+                if len(self._cache) >= _RESULT_CACHE_SIZE:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[cache_key] = result
+        return result
+    
+    def extract_text(self, image: Union[bytes, str]) -> Dict[str, Any]:
+        """
+        Extract text using Ollama vision model.
+
+        Accepts raw image bytes (preferred - callers that already hold the
+        file contents avoid a second read) or a path to the image file.
+        """
         start_time = time.time()
         
-        # Lazy availability check - only verify when actually used
-        try:
-            self._ensure_available()
-        except RuntimeError as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'metadata': {
-                    'backend': 'ollama',
-                    'model': self.model,
-                    'processing_time_seconds': time.time() - start_time
-                }
-            }
+        # Lazy availability check - only verify when actually used, and skip
+        # the call entirely while a healthy result is still fresh (an unlocked
+        # read; a stale view only costs one extra locked check)
+        if not self._is_available or time.monotonic() >= self._availability_expires_at:
+            try:
+                self._ensure_available()
+            except RuntimeError as e:
+                return self._error(str(e), start_time)
         
         try:
-            # Verify image exists
-            img_path = Path(image_path)
-            if not img_path.exists():
-                return {
-                    'success': False,
-                    'error': f"Image not found: {image_path}"
-                }
+            image_data = self._read_image(image)
+            if image_data is None:
+                return self._error(f"Image not found: {image}", start_time)
             
-            # Prepare prompt for structured extraction
-            prompt = """Extract ALL text from this alcohol beverage label image EXACTLY as it appears.
-
-CRITICAL: Preserve the EXACT capitalization, spacing, and formatting of all text. Do not normalize or change the case of any words.
-
-Please extract and list every piece of text you can see, line by line. Include:
-- Brand name (EXACT case)
-- Product type/class (e.g., "Bourbon Whiskey", "Pinot Noir", "IPA")
-- Alcohol content (e.g., "13.5% alc./vol.", "40% ABV", "80 Proof")
-- Net contents/volume (e.g., "750 mL", "12 fl oz")
-- Bottler/producer information (e.g., "Bottled by...", "Imported by...", "Produced by...")
-- Country of origin (e.g., "Product of France")
-- Government warning text (preserve EXACT capitalization - if it says "GOVERNMENT WARNING:" in all caps, write it that way)
-- Any other text visible on the label
-
-Format your response as plain text, with each distinct text element on its own line. Do NOT add bullet points, asterisks, or markdown formatting."""
+            cache_key = self._cache_key(image_data)
+            if cache_key is not None:
+                with self._lock:
+                    cached = self._cache.get(cache_key)
+                if cached is not None:
+                    # Copy so callers cannot mutate the cached entry, and
+                    # report this call's timing rather than the original's
+                    return {
+                        **cached,
+                        'metadata': {
+                            **cached['metadata'],
+                            'processing_time_seconds': time.time() - start_time,
+                            'cache_hit': True
+                        }
+                    }
 
             # Call Ollama using the client instance (which has the configured timeout).
             # Do NOT use self.ollama.chat() — the module-level function uses a default
             # httpx client with no timeout, causing requests to hang for 20+ minutes.
-            response = self._client.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt,
-                    'images': [str(img_path)]
-                }],
-                options={
-                    'temperature': 0.1,  # Low temperature for consistent extraction
-                },
-                keep_alive=-1  # Keep model loaded indefinitely to avoid 60s+ reload times
-            )
-            
-            extracted_text = response['message']['content'].strip()
-            processing_time = time.time() - start_time
-            
-            return {
-                'success': True,
-                'raw_text': extracted_text,
-                'metadata': {
-                    'backend': 'ollama',
-                    'model': self.model,
-                    'processing_time_seconds': processing_time,
-                    'confidence': 0.85  # Ollama doesn't provide confidence, use estimate
-                }
-            }
+            response = self._client.chat(**self._chat_kwargs(_downscale_image(image_data)))
+            return self._build_result(response, start_time, cache_key)
             
         except Exception as e:
-            return {
-                'success': False,
-                'error': f"Ollama extraction error: {str(e)}",
-                'metadata': {
-                    'backend': 'ollama',
-                    'model': self.model,
-                    'processing_time_seconds': time.time() - start_time
-                }
-            }
+            return self._error(f"Ollama extraction error: {str(e)}", start_time,
+                               connection_error=isinstance(e, _CONNECTION_ERRORS))
 
 
 def get_ocr_backend(**kwargs) -> OCRBackend:
@@ -238,15 +430,21 @@ if __name__ == "__main__":
     
     image_path = sys.argv[1]
     
+    def dump(obj):
+        if orjson:
+            sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2) + b"\n")
+        else:
+            print(json.dumps(obj, indent=2))
+    
     try:
         backend = get_ocr_backend()
         result = backend.extract_text(image_path)
         
-        print(json.dumps(result, indent=2))
+        dump(result)
         
     except Exception as e:
-        print(json.dumps({
+        dump({
             'success': False,
             'error': str(e)
-        }, indent=2))
+        })
         sys.exit(1)
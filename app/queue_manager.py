@@ -22,32 +22,95 @@ Table: verify_jobs
   created_at    REAL              Unix timestamp (float)
   updated_at    REAL              Unix timestamp (float)
   completed_at  REAL              Unix timestamp, nullable
+
+Table: queue_meta  (maintained by triggers on verify_jobs)
+  status        TEXT PRIMARY KEY  'pending'
+  n             INTEGER           number of jobs currently in that status
 """
 
+import copy
 import json
 import logging
+import os
 import sqlite3
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Generator, Optional
+from typing import Any, Dict, Generator, List, Optional, Tuple
 
 logger = logging.getLogger("ttb_queue")
 
+# JSON columns (ground_truth, result) are encoded with orjson when available.
+# Stored as TEXT either way, so rows stay readable by both code paths.
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    _loads = orjson.loads
+except ImportError:  # optional speedup; fall back to the stdlib json module
+    _dumps = json.dumps
+    _loads = json.loads
+
 # Shared DB file lives on the bind-mounted volume so both containers see it.
 _DEFAULT_DB_PATH = Path("/app/tmp/queue.db")
 
 # How long after completion before a record is eligible for cleanup (seconds).
 _COMPLETED_RETENTION_SECONDS = 4 * 3600  # 4 hours
 
+# Per-connection read tuning (see _connect).
+_MMAP_SIZE_BYTES = 256 * 1024 * 1024  # 256 MiB
+_CACHE_SIZE_KIB = 64 * 1024  # 64 MiB
+
+# Default period of the optional background WAL checkpointer.
+_CHECKPOINT_INTERVAL_SECONDS = 5.0
+
+# How often wait_for_job() re-reads the pending count for cross-process
+# enqueues.  Matches the worker's old 2 s poll: the in-process event cannot
+# reach the worker container, and a shorter interval would trade a little
+# pickup latency (small next to ~10 s of inference) for constant idle reads.
+_WAKEUP_CHECK_SECONDS = 2.0
+
+# Maximum rows removed per cleanup transaction.
+_CLEANUP_BATCH_SIZE = 500
+
+# UPDATE/DELETE ... RETURNING needs SQLite 3.35+; older builds use two statements.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Jobs in these states never change again (retries create a new job), so
+# get() can serve them from memory instead of re-reading SQLite on every poll.
+_TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled"})
+_TERMINAL_CACHE_MAX = 4096
+_STATUS_FIELDS = ("status", "attempts", "max_attempts", "error")
+# Bounds staleness if another process deletes the row during cleanup.
+_TERMINAL_CACHE_TTL_SECONDS = 300
+
 
 class QueueManager:
     """Thread-safe, multi-process-safe SQLite queue for verify jobs."""
 
     def __init__(self, db_path: Path = _DEFAULT_DB_PATH, max_attempts: int = 3):
+        """
+        db_path may be ":memory:" for a private in-memory queue (tests): each
+        instance gets its own shared-cache memory DB that every thread sees
+        and that lives as long as the instance.
+        """
         self.db_path = db_path
         self.max_attempts = max_attempts
+        self._memory_uri: Optional[str] = None
+        self._memory_anchor: Optional[sqlite3.Connection] = None
+        if str(db_path) == ":memory:":
+            self._memory_uri = f"file:queue-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._memory_anchor = self._connect()
+        self._local = threading.local()
+        self._terminal_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._terminal_cache_lock = threading.Lock()
+        self._checkpoint_stop: Optional[threading.Event] = None
+        self._new_job = threading.Event()
         self._init_db()
 
     # ------------------------------------------------------------------
@@ -58,29 +121,108 @@ class QueueManager:
         """
         Open a connection with WAL mode and a short busy timeout so concurrent
         writers back off gracefully instead of raising OperationalError.
+
+        The connection is in autocommit mode; _db() opens transactions
+        explicitly.
         """
-        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        if self._memory_uri is not None:
+            conn = sqlite3.connect(self._memory_uri, timeout=10, isolation_level=None, uri=True)
+        else:
+            conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("PRAGMA synchronous=NORMAL")
         conn.execute("PRAGMA foreign_keys=ON")
+        # Status polling is read-heavy: serve pages via mmap and a larger page
+        # cache (both only grow as far as the DB file itself).
+        conn.execute(f"PRAGMA mmap_size={_MMAP_SIZE_BYTES}")
+        conn.execute(f"PRAGMA cache_size=-{_CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it on first use.
+
+        Connections are cached per thread (sqlite3 connections must not be
+        shared across threads) and per process, so a connection inherited
+        across fork() is never reused.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
         return conn
 
     @contextmanager
-    def _db(self) -> Generator[sqlite3.Connection, None, None]:
-        conn = self._connect()
+    def _db(self, write: bool = True) -> Generator[sqlite3.Connection, None, None]:
+        """
+        Yield the thread's connection.
+
+        Writes run inside BEGIN IMMEDIATE so the write lock is taken up front
+        and read-then-update sequences cannot interleave with another writer.
+        Reads run in autocommit mode and never block the writer.
+        """
+        conn = self._conn()
+        if not write:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
         try:
             yield conn
             conn.commit()
         except Exception:
             conn.rollback()
             raise
-        finally:
+
+    def close(self) -> None:
+        """Close the calling thread's connection, if open."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
             conn.close()
+            self._local.conn = None
+
+    def start_checkpointer(self, interval: float = _CHECKPOINT_INTERVAL_SECONDS) -> None:
+        """
+        Run PASSIVE WAL checkpoints from a daemon thread every interval seconds.
+
+        With synchronous=NORMAL, commits do not fsync; the fsync happens when
+        the WAL is checkpointed.  SQLite otherwise auto-checkpoints inside
+        whichever commit pushes the WAL past 1000 pages, so an unlucky
+        enqueue() pays for it.  Checkpointing in the background keeps the WAL
+        short enough that request-path commits rarely trigger one.
+        Durability is unchanged.  No-op if already running.
+        """
+        if self._checkpoint_stop is not None:
+            return
+        stop = self._checkpoint_stop = threading.Event()
+
+        def _run() -> None:
+            while not stop.wait(interval):
+                try:
+                    self._conn().execute("PRAGMA wal_checkpoint(PASSIVE)")
+                except sqlite3.Error as exc:
+                    logger.warning(f"[queue] WAL checkpoint failed: {exc}")
+            self.close()
+
+        threading.Thread(target=_run, name="queue-checkpointer", daemon=True).start()
+
+    def stop_checkpointer(self) -> None:
+        """Stop the background checkpointer, if running."""
+        if self._checkpoint_stop is not None:
+            self._checkpoint_stop.set()
+            self._checkpoint_stop = None
 
     def _init_db(self) -> None:
         """Create table if it doesn't exist."""
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if not _HAS_RETURNING:
+            logger.warning(
+                f"[queue] SQLite {sqlite3.sqlite_version} lacks RETURNING; "
+                "using two-statement dequeue/cleanup"
+            )
+        if self._memory_uri is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         with self._db() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS verify_jobs (
@@ -97,9 +239,54 @@ class QueueManager:
                     completed_at  REAL
                 )
             """)
+            # (status, created_at) lets dequeue read the oldest pending job
+            # straight off the index; status-only queries use its prefix.
             conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_status ON verify_jobs (status)"
+                "CREATE INDEX IF NOT EXISTS idx_status_created "
+                "ON verify_jobs (status, created_at)"
             )
+            conn.execute("DROP INDEX IF EXISTS idx_status")
+
+            # Pending-job counter kept current by triggers, so queue_depth()
+            # is a single-row read instead of a COUNT(*) over the backlog.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queue_meta (
+                    status  TEXT    PRIMARY KEY,
+                    n       INTEGER NOT NULL
+                )
+            """)
+            # (execute() per statement: executescript() would commit the
+            # surrounding transaction early.)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_pending_insert
+                AFTER INSERT ON verify_jobs WHEN NEW.status = 'pending'
+                BEGIN
+                    UPDATE queue_meta SET n = n + 1 WHERE status = 'pending';
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_pending_delete
+                AFTER DELETE ON verify_jobs WHEN OLD.status = 'pending'
+                BEGIN
+                    UPDATE queue_meta SET n = n - 1 WHERE status = 'pending';
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_pending_update
+                AFTER UPDATE OF status ON verify_jobs
+                WHEN (OLD.status = 'pending') != (NEW.status = 'pending')
+                BEGIN
+                    UPDATE queue_meta
+                    SET n = n + (NEW.status = 'pending') - (OLD.status = 'pending')
+                    WHERE status = 'pending';
+                END
+            """)
+            # Re-seed from the table under the write lock; cheap at startup and
+            # correct for databases created before the counter existed.
+            conn.execute("""
+                INSERT OR REPLACE INTO queue_meta (status, n)
+                SELECT 'pending', COUNT(*) FROM verify_jobs WHERE status = 'pending'
+            """)
 
     # ------------------------------------------------------------------
     # Public API
@@ -122,7 +309,7 @@ class QueueManager:
         """
         job_id = str(uuid.uuid4())
         now = time.time()
-        ground_truth_json = json.dumps(ground_truth) if ground_truth else None
+        ground_truth_json = _dumps(ground_truth) if ground_truth else None
 
         with self._db() as conn:
             conn.execute(
@@ -135,49 +322,102 @@ class QueueManager:
                 (job_id, self.max_attempts, image_path, ground_truth_json, now, now),
             )
 
+        self._new_job.set()
         logger.info(f"[queue] Enqueued job {job_id} for {Path(image_path).name}")
         return job_id
 
+    def wait_for_job(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to timeout seconds for a pending job, then claim it.
+
+        Enqueues from this process wake the waiter immediately.  Enqueues from
+        another process (the API container) are noticed by re-reading the
+        pending count every _WAKEUP_CHECK_SECONDS, so they may wait up to that
+        long.  Both checks are reads, so an idle waiter never takes the write
+        lock that dequeue() needs.
+
+        Returns the claimed job dict, or None if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.queue_depth() > 0:
+                job = self.dequeue()
+                if job is not None:
+                    return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self._new_job.wait(min(remaining, _WAKEUP_CHECK_SECONDS)):
+                self._new_job.clear()
+
     def dequeue(self) -> Optional[Dict[str, Any]]:
         """
         Atomically claim the next pending job for processing.
 
         Returns a dict with the job's fields, or None if the queue is empty.
-        Uses a write transaction with a SELECT … WHERE status='pending' ORDER BY
-        created_at LIMIT 1, then immediately updates to 'processing'.
+        A single UPDATE … WHERE id = (SELECT … WHERE status='pending' ORDER BY
+        created_at LIMIT 1) RETURNING * claims the job and returns the
+        post-update row.
         """
+        now = time.time()
         with self._db() as conn:
-            row = conn.execute(
-                """
-                SELECT * FROM verify_jobs
-                WHERE status = 'pending'
-                ORDER BY created_at ASC
-                LIMIT 1
-                """
-            ).fetchone()
-
-            if row is None:
-                return None
+            if _HAS_RETURNING:
+                row = conn.execute(
+                    """
+                    UPDATE verify_jobs
+                    SET status = 'processing',
+                        attempts = attempts + 1,
+                        updated_at = ?
+                    WHERE id = (
+                        SELECT id FROM verify_jobs
+                        WHERE status = 'pending'
+                        ORDER BY created_at ASC
+                        LIMIT 1
+                    )
+                    RETURNING *
+                    """,
+                    (now,),
+                ).fetchone()
+            else:
+                row = self._dequeue_select_update(conn, now)
 
-            now = time.time()
-            conn.execute(
-                """
-                UPDATE verify_jobs
-                SET status = 'processing',
-                    attempts = attempts + 1,
-                    updated_at = ?
-                WHERE id = ?
-                """,
-                (now, row["id"]),
-            )
+        if row is None:
+            return None
 
         job = dict(row)
-        job["attempts"] += 1  # reflect the increment above
-        job["status"] = "processing"  # reflect the UPDATE above
         if job.get("ground_truth"):
-            job["ground_truth"] = json.loads(job["ground_truth"])
+            job["ground_truth"] = _loads(job["ground_truth"])
         return job
 
+    @staticmethod
+    def _dequeue_select_update(conn: sqlite3.Connection, now: float) -> Optional[sqlite3.Row]:
+        """dequeue() for SQLite < 3.35: SELECT the next job, then UPDATE it."""
+        row = conn.execute(
+            """
+            SELECT id FROM verify_jobs
+            WHERE status = 'pending'
+            ORDER BY created_at ASC
+            LIMIT 1
+            """
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        conn.execute(
+            """
+            UPDATE verify_jobs
+            SET status = 'processing',
+                attempts = attempts + 1,
+                updated_at = ?
+            WHERE id = ?
+            """,
+            (now, row["id"]),
+        )
+        return conn.execute(
+            "SELECT * FROM verify_jobs WHERE id = ?", (row["id"],)
+        ).fetchone()
+
     def complete(self, job_id: str, result: Dict[str, Any]) -> None:
         """Mark a job as successfully completed with its result dict."""
         now = time.time()
@@ -192,7 +432,7 @@ class QueueManager:
                     completed_at = ?
                 WHERE id = ?
                 """,
-                (json.dumps(result), now, now, job_id),
+                (_dumps(result), now, now, job_id),
             )
         logger.info(f"[queue] Job {job_id} completed")
 
@@ -202,55 +442,91 @@ class QueueManager:
 
         If the job has remaining attempts, put it back to 'pending' so the
         worker will retry.  If all attempts are exhausted, mark 'failed'.
+        Both cases are a single conditional UPDATE.
         """
         now = time.time()
         with self._db() as conn:
-            row = conn.execute(
-                "SELECT attempts, max_attempts FROM verify_jobs WHERE id = ?",
-                (job_id,),
-            ).fetchone()
-
-            if row is None:
-                logger.warning(f"[queue] fail() called for unknown job {job_id}")
-                return
-
-            if row["attempts"] < row["max_attempts"]:
-                # Still have retries left — requeue
-                conn.execute(
-                    """
-                    UPDATE verify_jobs
-                    SET status = 'pending',
-                        error = ?,
-                        updated_at = ?
-                    WHERE id = ?
-                    """,
-                    (error, now, job_id),
-                )
-                logger.warning(
-                    f"[queue] Job {job_id} failed (attempt {row['attempts']}"
-                    f"/{row['max_attempts']}), requeuing. Error: {error}"
-                )
-            else:
-                # All retries exhausted
-                conn.execute(
+            if _HAS_RETURNING:
+                row = conn.execute(
                     """
                     UPDATE verify_jobs
-                    SET status = 'failed',
+                    SET status = CASE WHEN attempts < max_attempts
+                                      THEN 'pending' ELSE 'failed' END,
                         error = ?,
                         updated_at = ?,
-                        completed_at = ?
+                        completed_at = CASE WHEN attempts < max_attempts
+                                            THEN completed_at ELSE ? END
                     WHERE id = ?
+                    RETURNING status, attempts, max_attempts
                     """,
                     (error, now, now, job_id),
-                )
-                logger.error(
-                    f"[queue] Job {job_id} permanently failed after "
-                    f"{row['attempts']} attempts. Error: {error}"
-                )
+                ).fetchone()
+            else:
+                row = self._fail_select_update(conn, job_id, error, now)
+
+        if row is None:
+            logger.warning(f"[queue] fail() called for unknown job {job_id}")
+        elif row["status"] == "pending":
+            logger.warning(
+                f"[queue] Job {job_id} failed (attempt {row['attempts']}"
+                f"/{row['max_attempts']}), requeuing. Error: {error}"
+            )
+        else:
+            logger.error(
+                f"[queue] Job {job_id} permanently failed after "
+                f"{row['attempts']} attempts. Error: {error}"
+            )
+
+    @staticmethod
+    def _fail_select_update(
+        conn: sqlite3.Connection, job_id: str, error: str, now: float
+    ) -> Optional[Dict[str, Any]]:
+        """fail() for SQLite < 3.35: SELECT attempts, then UPDATE."""
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM verify_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        if row["attempts"] < row["max_attempts"]:
+            # Still have retries left — requeue
+            conn.execute(
+                """
+                UPDATE verify_jobs
+                SET status = 'pending',
+                    error = ?,
+                    updated_at = ?
+                WHERE id = ?
+                """,
+                (error, now, job_id),
+            )
+            new_status = "pending"
+        else:
+            # All retries exhausted
+            conn.execute(
+                """
+                UPDATE verify_jobs
+                SET status = 'failed',
+                    error = ?,
+                    updated_at = ?,
+                    completed_at = ?
+                WHERE id = ?
+                """,
+                (error, now, now, job_id),
+            )
+            new_status = "failed"
+        return {"status": new_status, **dict(row)}
 
     def get(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a job by ID.  Returns None if not found."""
-        with self._db() as conn:
+        cached = self._cached_terminal(job_id)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        now = time.monotonic()
+        with self._db(write=False) as conn:
             row = conn.execute(
                 "SELECT * FROM verify_jobs WHERE id = ?", (job_id,)
             ).fetchone()
@@ -260,11 +536,49 @@ class QueueManager:
 
         job = dict(row)
         if job.get("ground_truth"):
-            job["ground_truth"] = json.loads(job["ground_truth"])
+            job["ground_truth"] = _loads(job["ground_truth"])
         if job.get("result"):
-            job["result"] = json.loads(job["result"])
+            job["result"] = _loads(job["result"])
+
+        if job["status"] in _TERMINAL_STATUSES:
+            with self._terminal_cache_lock:
+                self._terminal_cache[job_id] = (now, copy.deepcopy(job))
+                if len(self._terminal_cache) > _TERMINAL_CACHE_MAX:
+                    self._terminal_cache.popitem(last=False)
         return job
 
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lightweight projection for status polling.
+
+        Returns only status, attempts, max_attempts and error (no ground
+        truth or result, so nothing to JSON-decode), or None if not found.
+        Use get() when the result itself is needed.
+        """
+        cached = self._cached_terminal(job_id)
+        if cached is not None:
+            return {field: cached[field] for field in _STATUS_FIELDS}
+
+        with self._db(write=False) as conn:
+            row = conn.execute(
+                "SELECT status, attempts, max_attempts, error "
+                "FROM verify_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def _cached_terminal(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached terminal job (shared, do not mutate) if still fresh."""
+        with self._terminal_cache_lock:
+            cached = self._terminal_cache.get(job_id)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] < _TERMINAL_CACHE_TTL_SECONDS:
+                self._terminal_cache.move_to_end(job_id)
+                return cached[1]
+            del self._terminal_cache[job_id]
+            return None
+
     def cancel(self, job_id: str) -> bool:
         """
         Cancel a pending job.  Has no effect if the job is already
@@ -291,26 +605,58 @@ class QueueManager:
         """
         Delete terminal jobs (completed/failed/cancelled) older than
         retention_seconds.  Returns the number of rows deleted.
+
+        Rows are deleted in batches of _CLEANUP_BATCH_SIZE, each in its own
+        short write transaction, so enqueue/dequeue never wait behind one
+        large DELETE.
         """
         cutoff = time.time() - retention_seconds
-        with self._db() as conn:
-            cursor = conn.execute(
-                """
-                DELETE FROM verify_jobs
-                WHERE status IN ('completed', 'failed', 'cancelled')
-                  AND updated_at < ?
-                """,
-                (cutoff,),
-            )
-        count = cursor.rowcount
+        count = 0
+        while True:
+            with self._db() as conn:
+                deleted_ids = self._delete_old_batch(conn, cutoff)
+            with self._terminal_cache_lock:
+                for job_id in deleted_ids:
+                    self._terminal_cache.pop(job_id, None)
+            count += len(deleted_ids)
+            if len(deleted_ids) < _CLEANUP_BATCH_SIZE:
+                break
         if count:
             logger.info(f"[queue] Cleaned up {count} old verify jobs")
         return count
 
+    @staticmethod
+    def _delete_old_batch(conn: sqlite3.Connection, cutoff: float) -> List[str]:
+        """Delete up to _CLEANUP_BATCH_SIZE old terminal jobs; return their IDs."""
+        # Subquery + LIMIT because plain DELETE ... LIMIT needs a compile-time
+        # SQLite option.
+        old_jobs = """
+            SELECT id FROM verify_jobs
+            WHERE status IN ('completed', 'failed', 'cancelled')
+              AND updated_at < ?
+            LIMIT ?
+        """
+        if _HAS_RETURNING:
+            return [
+                row["id"]
+                for row in conn.execute(
+                    f"DELETE FROM verify_jobs WHERE id IN ({old_jobs}) RETURNING id",
+                    (cutoff, _CLEANUP_BATCH_SIZE),
+                )
+            ]
+        deleted_ids = [
+            row["id"] for row in conn.execute(old_jobs, (cutoff, _CLEANUP_BATCH_SIZE))
+        ]
+        conn.executemany(
+            "DELETE FROM verify_jobs WHERE id = ?",
+            [(job_id,) for job_id in deleted_ids],
+        )
+        return deleted_ids
+
     def queue_depth(self) -> int:
         """Return the number of jobs currently in 'pending' status."""
-        with self._db() as conn:
+        with self._db(write=False) as conn:
             row = conn.execute(
-                "SELECT COUNT(*) as n FROM verify_jobs WHERE status = 'pending'"
+                "SELECT n FROM queue_meta WHERE status = 'pending'"
             ).fetchone()
         return row["n"] if row else 0
@@ -1,39 +1,104 @@
 """Shared pytest fixtures for TTB Label Verifier tests."""
 import pytest
+import io
 import json
+import zipfile
 from pathlib import Path
 from typing import Dict, Any
 from unittest.mock import patch
 
 
+# Fixtures that need the golden samples; their tests are skipped up front
+# when the samples are not installed instead of each fixture skipping.
+_SAMPLE_FIXTURES = frozenset({
+    "sample_image_bytes",
+    "sample_batch_zip",
+    "good_ground_truth",
+    "bad_ground_truth",
+})
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip golden-sample tests at collection time if the samples are missing."""
+    samples = Path(__file__).parent.parent / "samples"
+    if (samples / "label_good_001.jpg").exists():
+        return
+    skip = pytest.mark.skip(reason=f"Golden samples not found: {samples}")
+    for item in items:
+        if _SAMPLE_FIXTURES.intersection(getattr(item, "fixturenames", ())):
+            item.add_marker(skip)
+
+
+# Already-compressed formats gain nothing from deflate; store them as-is.
+_PRECOMPRESSED_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".webp", ".gz", ".zip"})
+
+
+def _zip_compress_type(path) -> int:
+    """ZIP compression method for a member built from path."""
+    if Path(path).suffix.lower() in _PRECOMPRESSED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
 # Paths
-@pytest.fixture
+@pytest.fixture(scope="session")
 def project_root():
     """Project root directory."""
     return Path(__file__).parent.parent
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def samples_dir(project_root):
     """Golden samples directory."""
     return project_root / "samples"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def good_label_path(samples_dir):
     """Path to first good label."""
     return samples_dir / "label_good_001.jpg"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def bad_label_path(samples_dir):
     """Path to first bad label."""
     return samples_dir / "label_bad_001.jpg"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def sample_image_bytes(good_label_path) -> bytes:
+    """First good label image as bytes (read once per session)."""
+    if not good_label_path.exists():
+        pytest.skip(f"Sample image not found: {good_label_path}")
+    return good_label_path.read_bytes()
+
+
+@pytest.fixture(scope="session")
+def sample_batch_zip(samples_dir) -> bytes:
+    """Batch ZIP of the first 3 good labels and their JSON (built once per session)."""
+    if not samples_dir.exists():
+        pytest.skip(f"Samples directory not found: {samples_dir}")
+    
+    good_labels = sorted(samples_dir.glob("label_good_*.jpg"))[:3]
+    if len(good_labels) < 3:
+        pytest.skip("Not enough sample images for batch test")
+    
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w') as zf:
+        for label_path in good_labels:
+            zf.write(label_path, arcname=label_path.name,
+                     compress_type=_zip_compress_type(label_path))
+            json_path = label_path.with_suffix('.json')
+            if json_path.exists():
+                zf.write(json_path, arcname=json_path.name,
+                         compress_type=_zip_compress_type(json_path))
+    
+    return zip_buffer.getvalue()
+
+
+@pytest.fixture(scope="session")
 def good_ground_truth(samples_dir) -> Dict[str, Any]:
-    """Load ground truth for good label."""
+    """Load ground truth for good label (read once per session; do not mutate)."""
     json_path = samples_dir / "label_good_001.json"
     if not json_path.exists():
         pytest.skip(f"Golden sample not found: {json_path}")
@@ -43,9 +108,9 @@ def good_ground_truth(samples_dir) -> Dict[str, Any]:
     return data['ground_truth']
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def bad_ground_truth(samples_dir) -> Dict[str, Any]:
-    """Load ground truth for bad label."""
+    """Load ground truth for bad label (read once per session; do not mutate)."""
     json_path = samples_dir / "label_bad_001.json"
     if not json_path.exists():
         pytest.skip(f"Golden sample not found: {json_path}")
@@ -55,6 +120,37 @@ def bad_ground_truth(samples_dir) -> Dict[str, Any]:
     return data['ground_truth']
 
 
+# API client
+@pytest.fixture(scope="session")
+def _session_client():
+    """One FastAPI test client shared by the whole session."""
+    from fastapi.testclient import TestClient
+    from api import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def client(_session_client):
+    """FastAPI test client with a clean cookie jar."""
+    _session_client.cookies.clear()
+    return _session_client
+
+
+@pytest.fixture(scope="session")
+def session_cookie() -> str:
+    """Signed session cookie for "testuser" (stateless, so one serves every test)."""
+    from auth import create_session_cookie
+    return create_session_cookie("testuser")
+
+
+@pytest.fixture
+def authenticated_client(client, session_cookie):
+    """FastAPI test client carrying a valid session cookie."""
+    from auth import SESSION_COOKIE_NAME
+    client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
+    return client
+
+
 # Mock OCR outputs
 @pytest.fixture
 def mock_ocr_text_good():
@@ -1,4 +1,6 @@
 """Tests for QueueManager and async verify API endpoints."""
+import asyncio
+import itertools
 import json
 import tempfile
 import time
@@ -6,7 +8,6 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
-from fastapi.testclient import TestClient
 
 
 # ============================================================================
@@ -14,21 +15,89 @@ from fastapi.testclient import TestClient
 # ============================================================================
 
 @pytest.fixture
-def tmp_db(tmp_path):
-    """A fresh QueueManager backed by a temp DB for each test."""
+def tmp_db():
+    """A fresh in-memory QueueManager for each test."""
     # Import here so sys.path issues are isolated
     from queue_manager import QueueManager
-    return QueueManager(db_path=tmp_path / "test_queue.db", max_attempts=3)
+    return QueueManager(db_path=":memory:", max_attempts=3)
 
 
-@pytest.fixture
-def sample_image(tmp_path):
-    """A tiny valid-looking image file."""
-    p = tmp_path / "label.jpg"
-    p.write_bytes(b"\xff\xd8\xff\xe0" + b"\x00" * 100)  # JPEG magic bytes
+# JPEG magic bytes only; the queue stores the path and never decodes it.
+_FAKE_JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 100
+
+
+@pytest.fixture(scope="session")
+def sample_image(tmp_path_factory):
+    """A tiny valid-looking image file, written once per session."""
+    p = tmp_path_factory.mktemp("images") / "label.jpg"
+    p.write_bytes(_FAKE_JPEG)
     return str(p)
 
 
+def _set_attempts(queue, job_id, attempts):
+    """Inject a job's attempt count directly instead of replaying dequeue/fail rounds."""
+    with queue._db() as conn:
+        conn.execute("UPDATE verify_jobs SET attempts = ? WHERE id = ?", (attempts, job_id))
+
+
+class TestQueueManagerConnection:
+    def test_connection_reused_within_thread(self, tmp_db):
+        assert tmp_db._conn() is tmp_db._conn()
+
+    def test_each_thread_gets_own_connection(self, tmp_db, sample_image):
+        import threading
+        conns = []
+        t = threading.Thread(target=lambda: conns.append(tmp_db._conn()))
+        t.start()
+        t.join()
+        assert conns[0] is not tmp_db._conn()
+
+    def test_read_pragmas_applied(self, tmp_path):
+        import queue_manager
+        # mmap only applies to file-backed databases
+        conn = queue_manager.QueueManager(db_path=tmp_path / "q.db")._conn()
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == queue_manager._MMAP_SIZE_BYTES
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -queue_manager._CACHE_SIZE_KIB
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+    def test_memory_db_shared_across_threads(self, tmp_db, sample_image):
+        import threading
+        job_id = tmp_db.enqueue(sample_image)
+        seen = []
+        t = threading.Thread(target=lambda: seen.append(tmp_db.get_status(job_id)))
+        t.start()
+        t.join()
+        assert seen[0]["status"] == "pending"
+
+    def test_memory_dbs_are_private(self, tmp_db, sample_image):
+        from queue_manager import QueueManager
+        tmp_db.enqueue(sample_image)
+        assert QueueManager(db_path=":memory:").queue_depth() == 0
+
+    def test_checkpointer_start_stop(self, tmp_db):
+        import threading
+
+        def checkpointers():
+            return [t for t in threading.enumerate() if t.name == "queue-checkpointer"]
+
+        before = len(checkpointers())
+        tmp_db.start_checkpointer(interval=0.01)
+        tmp_db.start_checkpointer(interval=0.01)  # second call is a no-op
+        assert len(checkpointers()) == before + 1
+        thread = checkpointers()[-1]
+        tmp_db.stop_checkpointer()
+        thread.join(timeout=2)
+        assert not thread.is_alive()
+
+    def test_failed_write_rolls_back(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        with pytest.raises(RuntimeError):
+            with tmp_db._db() as conn:
+                conn.execute("DELETE FROM verify_jobs")
+                raise RuntimeError("boom")
+        assert tmp_db.get(job_id) is not None
+
+
 class TestQueueManagerEnqueue:
     def test_enqueue_returns_job_id(self, tmp_db, sample_image):
         job_id = tmp_db.enqueue(sample_image)
@@ -59,6 +128,28 @@ class TestQueueManagerEnqueue:
         assert tmp_db.queue_depth() == 2
 
 
+    def test_queue_depth_tracks_every_transition(self, tmp_db, sample_image):
+        ids = [tmp_db.enqueue(sample_image) for _ in range(3)]
+        tmp_db.cancel(ids[0])
+        assert tmp_db.queue_depth() == 2
+        job = tmp_db.dequeue()
+        assert tmp_db.queue_depth() == 1
+        tmp_db.fail(job["id"], "timeout")  # requeued
+        assert tmp_db.queue_depth() == 2
+        tmp_db.cleanup_old_jobs(retention_seconds=0)  # removes the cancelled job only
+        assert tmp_db.queue_depth() == 2
+
+    def test_queue_depth_seeded_from_existing_rows(self, tmp_path, sample_image):
+        from queue_manager import QueueManager
+        db_path = tmp_path / "existing.db"
+        first = QueueManager(db_path=db_path)
+        first.enqueue(sample_image)
+        first.enqueue(sample_image)
+        with first._db() as conn:
+            conn.execute("DELETE FROM queue_meta")
+        assert QueueManager(db_path=db_path).queue_depth() == 2
+
+
 class TestQueueManagerDequeue:
     def test_dequeue_empty_returns_none(self, tmp_db):
         assert tmp_db.dequeue() is None
@@ -79,9 +170,10 @@ class TestQueueManagerDequeue:
         assert tmp_db.queue_depth() == 1
 
     def test_dequeue_fifo_order(self, tmp_db, sample_image):
-        id1 = tmp_db.enqueue(sample_image)
-        time.sleep(0.01)
-        id2 = tmp_db.enqueue(sample_image)
+        # Deterministic, strictly increasing created_at instead of sleeping
+        with patch("queue_manager.time.time", side_effect=itertools.count(1000.0)):
+            id1 = tmp_db.enqueue(sample_image)
+            id2 = tmp_db.enqueue(sample_image)
         first = tmp_db.dequeue()
         second = tmp_db.dequeue()
         assert first["id"] == id1
@@ -92,6 +184,47 @@ class TestQueueManagerDequeue:
         tmp_db.dequeue()  # claims the only job
         assert tmp_db.dequeue() is None
 
+    def test_dequeue_order_uses_index(self, tmp_db):
+        plan = tmp_db._conn().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM verify_jobs "
+            "WHERE status = 'pending' ORDER BY created_at ASC LIMIT 1"
+        ).fetchall()
+        details = " ".join(row["detail"] for row in plan)
+        assert "idx_status_created" in details
+        assert "TEMP B-TREE" not in details
+
+    def test_dequeue_without_returning_support(self, tmp_db, sample_image, monkeypatch):
+        import queue_manager
+        monkeypatch.setattr(queue_manager, "_HAS_RETURNING", False)
+        job_id = tmp_db.enqueue(sample_image, ground_truth={"abv": 7.5})
+        job = tmp_db.dequeue()
+        assert job["id"] == job_id
+        assert job["status"] == "processing"
+        assert job["attempts"] == 1
+        assert job["ground_truth"] == {"abv": 7.5}
+        assert tmp_db.dequeue() is None
+
+
+class TestQueueManagerWaitForJob:
+    def test_returns_pending_job_immediately(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        assert tmp_db.wait_for_job(timeout=5)["id"] == job_id
+
+    def test_times_out_on_empty_queue(self, tmp_db):
+        start = time.monotonic()
+        assert tmp_db.wait_for_job(timeout=0.05) is None
+        assert time.monotonic() - start < 1
+
+    def test_woken_by_enqueue_from_another_thread(self, tmp_db, sample_image):
+        import threading
+        timer = threading.Timer(0.05, tmp_db.enqueue, args=(sample_image,))
+        timer.start()
+        start = time.monotonic()
+        job = tmp_db.wait_for_job(timeout=5)
+        timer.join()
+        assert job is not None
+        assert time.monotonic() - start < 1
+
 
 class TestQueueManagerComplete:
     def test_complete_marks_completed(self, tmp_db, sample_image):
@@ -114,26 +247,46 @@ class TestQueueManagerComplete:
         job = tmp_db.get(job_id)
         assert job["error"] is None
 
+    def test_complete_stores_validator_enums_as_strings(self, tmp_db, sample_image):
+        from label_validator import ValidationLevel, ValidationStatus
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.dequeue()
+        tmp_db.complete(job_id, {
+            "status": ValidationStatus.COMPLIANT,
+            "validation_level": ValidationLevel.STRUCTURAL_ONLY,
+        })
+        assert tmp_db.get(job_id)["result"] == {
+            "status": "COMPLIANT",
+            "validation_level": "STRUCTURAL_ONLY",
+        }
+
 
 class TestQueueManagerFail:
-    def test_fail_requeues_when_attempts_remaining(self, tmp_db, sample_image):
+    @pytest.mark.parametrize("attempt, expected_status, expected_attempts, completed", [
+        (1, "pending", 1, False),  # attempts remaining: requeued for retry
+        (3, "failed", 3, True),    # exhausted: permanently failed
+    ])
+    def test_fail_behavior(self, tmp_db, sample_image, attempt, expected_status,
+                           expected_attempts, completed):
         job_id = tmp_db.enqueue(sample_image)
-        tmp_db.dequeue()  # attempts=1, max=3
+        _set_attempts(tmp_db, job_id, attempt - 1)  # skip the earlier failed rounds
+        tmp_db.dequeue()
         tmp_db.fail(job_id, "timeout")
         job = tmp_db.get(job_id)
-        # Should go back to pending for retry
-        assert job["status"] == "pending"
+        assert job["status"] == expected_status
+        assert job["attempts"] == expected_attempts
         assert job["error"] == "timeout"
+        assert (job["completed_at"] is not None) is completed
 
-    def test_fail_permanently_fails_after_max_attempts(self, tmp_db, sample_image):
+    @pytest.mark.parametrize("attempts, expected", [(1, "pending"), (3, "failed")])
+    def test_fail_without_returning_support(self, tmp_db, sample_image, monkeypatch,
+                                            attempts, expected):
+        import queue_manager
+        monkeypatch.setattr(queue_manager, "_HAS_RETURNING", False)
         job_id = tmp_db.enqueue(sample_image)
-        # Exhaust all attempts
-        for _ in range(3):
-            tmp_db.dequeue()
-            tmp_db.fail(job_id, "timeout")
-        job = tmp_db.get(job_id)
-        assert job["status"] == "failed"
-        assert job["attempts"] == 3
+        _set_attempts(tmp_db, job_id, attempts)
+        tmp_db.fail(job_id, "timeout")
+        assert tmp_db.get(job_id)["status"] == expected
 
     def test_fail_unknown_job_is_noop(self, tmp_db):
         # Should not raise
@@ -141,20 +294,16 @@ class TestQueueManagerFail:
 
 
 class TestQueueManagerCancel:
-    def test_cancel_pending_job(self, tmp_db, sample_image):
-        job_id = tmp_db.enqueue(sample_image)
-        cancelled = tmp_db.cancel(job_id)
-        assert cancelled is True
-        job = tmp_db.get(job_id)
-        assert job["status"] == "cancelled"
-
-    def test_cancel_processing_job_noop(self, tmp_db, sample_image):
+    @pytest.mark.parametrize("claimed, expected_cancelled, expected_status", [
+        (False, True, "cancelled"),    # pending jobs can be cancelled
+        (True, False, "processing"),   # claimed jobs are left alone
+    ])
+    def test_cancel(self, tmp_db, sample_image, claimed, expected_cancelled, expected_status):
         job_id = tmp_db.enqueue(sample_image)
-        tmp_db.dequeue()
-        cancelled = tmp_db.cancel(job_id)
-        assert cancelled is False
-        job = tmp_db.get(job_id)
-        assert job["status"] == "processing"
+        if claimed:
+            tmp_db.dequeue()
+        assert tmp_db.cancel(job_id) is expected_cancelled
+        assert tmp_db.get(job_id)["status"] == expected_status
 
 
 class TestQueueManagerGet:
@@ -171,6 +320,61 @@ class TestQueueManagerGet:
         assert job["max_attempts"] == 3
 
 
+class TestQueueManagerTerminalCache:
+    def _set_error(self, tmp_db, job_id, error):
+        with tmp_db._db() as conn:
+            conn.execute("UPDATE verify_jobs SET error = ? WHERE id = ?", (error, job_id))
+
+    def test_terminal_job_served_from_cache(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.dequeue()
+        tmp_db.complete(job_id, {"status": "COMPLIANT"})
+        tmp_db.get(job_id)
+        self._set_error(tmp_db, job_id, "changed behind the cache")
+        assert tmp_db.get(job_id)["error"] is None
+
+    def test_pending_job_not_cached(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.get(job_id)
+        self._set_error(tmp_db, job_id, "visible")
+        assert tmp_db.get(job_id)["error"] == "visible"
+
+    def test_cached_copy_not_shared(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.dequeue()
+        tmp_db.complete(job_id, {"status": "COMPLIANT"})
+        tmp_db.get(job_id)["result"]["status"] = "MUTATED"
+        assert tmp_db.get(job_id)["result"]["status"] == "COMPLIANT"
+
+    def test_cleanup_evicts_cached_job(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.dequeue()
+        tmp_db.complete(job_id, {"status": "COMPLIANT"})
+        tmp_db.get(job_id)
+        tmp_db.cleanup_old_jobs(retention_seconds=0)
+        assert tmp_db.get(job_id) is None
+
+
+class TestQueueManagerGetStatus:
+    def test_projection_fields(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image, ground_truth={"brand_name": "X"})
+        assert tmp_db.get_status(job_id) == {
+            "status": "pending", "attempts": 0, "max_attempts": 3, "error": None,
+        }
+
+    def test_not_found(self, tmp_db):
+        assert tmp_db.get_status("no-such-id") is None
+
+    def test_terminal_job_served_from_cache(self, tmp_db, sample_image):
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.dequeue()
+        tmp_db.complete(job_id, {"status": "COMPLIANT"})
+        tmp_db.get(job_id)
+        with tmp_db._db() as conn:
+            conn.execute("UPDATE verify_jobs SET status = 'pending' WHERE id = ?", (job_id,))
+        assert tmp_db.get_status(job_id)["status"] == "completed"
+
+
 class TestQueueManagerCleanup:
     def test_cleanup_removes_old_terminal_jobs(self, tmp_db, sample_image):
         job_id = tmp_db.enqueue(sample_image)
@@ -182,6 +386,25 @@ class TestQueueManagerCleanup:
         assert count == 1
         assert tmp_db.get(job_id) is None
 
+    def test_cleanup_without_returning_support(self, tmp_db, sample_image, monkeypatch):
+        import queue_manager
+        monkeypatch.setattr(queue_manager, "_HAS_RETURNING", False)
+        job_id = tmp_db.enqueue(sample_image)
+        tmp_db.dequeue()
+        tmp_db.complete(job_id, {"status": "COMPLIANT"})
+        assert tmp_db.cleanup_old_jobs(retention_seconds=0) == 1
+        assert tmp_db.get(job_id) is None
+
+    def test_cleanup_deletes_in_batches(self, tmp_db, sample_image, monkeypatch):
+        import queue_manager
+        monkeypatch.setattr(queue_manager, "_CLEANUP_BATCH_SIZE", 2)
+        for _ in range(5):
+            job_id = tmp_db.enqueue(sample_image)
+            tmp_db.cancel(job_id)
+        pending_id = tmp_db.enqueue(sample_image)
+        assert tmp_db.cleanup_old_jobs(retention_seconds=0) == 5
+        assert tmp_db.get(pending_id) is not None
+
     def test_cleanup_keeps_recent_jobs(self, tmp_db, sample_image):
         job_id = tmp_db.enqueue(sample_image)
         tmp_db.dequeue()
@@ -203,52 +426,50 @@ class TestQueueManagerCleanup:
 # Async verify API endpoint tests
 # ============================================================================
 
-@pytest.fixture
-def client():
-    from api import app
-    return TestClient(app)
-
-
-@pytest.fixture
-def authenticated_client(client):
-    from auth import create_session_cookie, SESSION_COOKIE_NAME
-    session_cookie = create_session_cookie("testuser")
-    client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
-    return client
-
-
-@pytest.fixture
-def sample_image_bytes(good_label_path):
-    if not good_label_path.exists():
-        pytest.skip(f"Sample image not found: {good_label_path}")
-    return good_label_path.read_bytes()
+@pytest.fixture(scope="module")
+def api_settings(tmp_path_factory):
+    """
+    Real Settings with the queue directory under a temp dir, swapped into
+    api once for the rest of the module.
+    """
+    import api
+    settings = api.settings.model_copy(update={
+        "queue_db_path": str(tmp_path_factory.mktemp("queue") / "api_test_queue.db"),
+    })
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(api, "settings", settings)
+        yield settings
+
+
+@pytest.fixture(scope="module")
+def module_queue():
+    """In-memory QueueManager shared by this module's API tests (schema built once)."""
+    from queue_manager import QueueManager
+    return QueueManager(db_path=":memory:", max_attempts=3)
 
 
 @pytest.fixture
-def patched_queue(tmp_path):
+def patched_queue(module_queue, monkeypatch):
     """
-    Patch verify_queue in both api and ui_routes modules with a fresh
-    QueueManager backed by a temp DB.
+    Patch verify_queue in both api and ui_routes modules with the module
+    queue, emptied again after each test.
     """
-    from queue_manager import QueueManager
-    q = QueueManager(db_path=tmp_path / "api_test_queue.db", max_attempts=3)
-    with patch("api.verify_queue", q), patch("ui_routes.verify_queue", q, create=True):
-        yield q
+    monkeypatch.setattr("api.verify_queue", module_queue)
+    monkeypatch.setattr("ui_routes.verify_queue", module_queue, raising=False)
+    yield module_queue
+    with module_queue._db() as conn:
+        conn.execute("DELETE FROM verify_jobs")
+    module_queue._terminal_cache.clear()
 
 
 class TestAsyncVerifySubmit:
-    def test_submit_returns_job_id(self, authenticated_client, sample_image_bytes, patched_queue, tmp_path):
-        with patch("api.settings") as mock_settings:
-            mock_settings.queue_db_path = str(tmp_path / "api_test_queue.db")
-            mock_settings.queue_max_attempts = 3
-            mock_settings.ollama_timeout_seconds = 60
-            mock_settings.max_file_size_mb = 10
-            mock_settings.max_file_size_bytes = 10 * 1024 * 1024
-            # Use actual validate_image_file path
-            response = authenticated_client.post(
-                "/verify/async",
-                files={"image": ("label.jpg", sample_image_bytes, "image/jpeg")},
-            )
+    def test_submit_returns_job_id(self, authenticated_client, sample_image_bytes, patched_queue,
+                                   api_settings):
+        # Use actual validate_image_file path
+        response = authenticated_client.post(
+            "/verify/async",
+            files={"image": ("label.jpg", sample_image_bytes, "image/jpeg")},
+        )
         # Should accept and enqueue
         assert response.status_code == 200
         data = response.json()
@@ -275,23 +496,37 @@ class TestAsyncVerifySubmit:
 
 
 class TestAsyncVerifyStatus:
-    def test_status_pending_job(self, authenticated_client, sample_image_bytes, patched_queue, tmp_path):
+    @pytest.fixture
+    def get_status(self, patched_queue, session_cookie):
+        """
+        GET /verify/status/{job_id} in-process via httpx's ASGI transport
+        (no TestClient portal thread per request).
+        """
+        import httpx
+        from api import app
+        from auth import SESSION_COOKIE_NAME
+
+        async def _get(job_id, authenticated):
+            cookies = {SESSION_COOKIE_NAME: session_cookie} if authenticated else None
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                         base_url="http://testserver", cookies=cookies) as c:
+                return await c.get(f"/verify/status/{job_id}")
+
+        return lambda job_id, authenticated=True: asyncio.run(_get(job_id, authenticated))
+
+    def test_status_pending_job(self, get_status, patched_queue, sample_image):
         # Enqueue directly via the queue
-        img = tmp_path / "label.jpg"
-        img.write_bytes(sample_image_bytes)
-        job_id = patched_queue.enqueue(str(img))
+        job_id = patched_queue.enqueue(sample_image)
 
-        response = authenticated_client.get(f"/verify/status/{job_id}")
+        response = get_status(job_id)
         assert response.status_code == 200
         data = response.json()
         assert data["job_id"] == job_id
         assert data["status"] == "pending"
         assert "queue_depth" in data
 
-    def test_status_completed_job_includes_result(self, authenticated_client, patched_queue, tmp_path):
-        img = tmp_path / "label.jpg"
-        img.write_bytes(b"\xff\xd8\xff" + b"\x00" * 50)
-        job_id = patched_queue.enqueue(str(img))
+    def test_status_completed_job_includes_result(self, get_status, patched_queue, sample_image):
+        job_id = patched_queue.enqueue(sample_image)
         patched_queue.dequeue()
 
         fake_result = {
@@ -305,31 +540,29 @@ class TestAsyncVerifyStatus:
         }
         patched_queue.complete(job_id, fake_result)
 
-        response = authenticated_client.get(f"/verify/status/{job_id}")
+        response = get_status(job_id)
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "completed"
         assert data["result"]["status"] == "COMPLIANT"
 
-    def test_status_failed_job(self, authenticated_client, patched_queue, tmp_path):
-        img = tmp_path / "label.jpg"
-        img.write_bytes(b"\xff\xd8\xff" + b"\x00" * 50)
-        job_id = patched_queue.enqueue(str(img))
-        # Exhaust all attempts
-        for _ in range(3):
-            patched_queue.dequeue()
-            patched_queue.fail(job_id, "Ollama timeout")
+    def test_status_failed_job(self, get_status, patched_queue, sample_image):
+        job_id = patched_queue.enqueue(sample_image)
+        # Final attempt fails
+        _set_attempts(patched_queue, job_id, 2)
+        patched_queue.dequeue()
+        patched_queue.fail(job_id, "Ollama timeout")
 
-        response = authenticated_client.get(f"/verify/status/{job_id}")
+        response = get_status(job_id)
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "failed"
         assert "Ollama timeout" in data["error"]
 
-    def test_status_not_found(self, authenticated_client, patched_queue):
-        response = authenticated_client.get("/verify/status/nonexistent-job-id")
+    def test_status_not_found(self, get_status):
+        response = get_status("nonexistent-job-id")
         assert response.status_code == 404
 
-    def test_status_unauthenticated(self, client, patched_queue):
-        response = client.get("/verify/status/some-job-id")
+    def test_status_unauthenticated(self, get_status):
+        response = get_status("some-job-id", authenticated=False)
         assert response.status_code in (401, 302, 403)
@@ -3,7 +3,6 @@ import pytest
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 
-from api import app
 from auth import create_session_cookie, verify_session_cookie, verify_credentials, SESSION_COOKIE_NAME
 
 
@@ -11,12 +10,6 @@ from auth import create_session_cookie, verify_session_cookie, verify_credential
 # Fixtures
 # ============================================================================
 
-@pytest.fixture
-def client():
-    """FastAPI test client."""
-    return TestClient(app)
-
-
 @pytest.fixture
 def mock_secrets_fixture():
     """Mock AWS Secrets Manager for testing."""
@@ -69,18 +62,20 @@ def test_destroy_session():
     assert verify_session_cookie("") is None
 
 
-@pytest.mark.skip(reason="Fixture dependency issues with mock_secrets_fixture")
-def test_verify_credentials_success(mock_secrets_fixture):
-    """Test successful credential verification."""
-    result = verify_credentials('testuser', 'testpass')
-    assert result is True
+class TestVerifyCredentials:
+    """Credential checks against (mocked) Secrets Manager."""
 
+    pytestmark = pytest.mark.skip(reason="Fixture dependency issues with mock_secrets_fixture")
 
-@pytest.mark.skip(reason="Fixture dependency issues with mock_secrets_fixture")
-def test_verify_credentials_failure(mock_secrets_fixture):
-    """Test failed credential verification."""
-    result = verify_credentials('wronguser', 'wrongpass')
-    assert result is False
+    def test_verify_credentials_success(self, mock_secrets_fixture):
+        """Test successful credential verification."""
+        result = verify_credentials('testuser', 'testpass')
+        assert result is True
+
+    def test_verify_credentials_failure(self, mock_secrets_fixture):
+        """Test failed credential verification."""
+        result = verify_credentials('wronguser', 'wrongpass')
+        assert result is False
 
 
 @pytest.mark.skip(reason="Patch path issues with aws_secrets module")
@@ -88,7 +83,7 @@ def test_verify_credentials_failure(mock_secrets_fixture):
 def test_verify_credentials_exception(mock_get_secret):
     """Test credential verification handles exceptions gracefully."""
     mock_get_secret.side_effect = Exception("Secrets Manager unavailable")
-    
+
     result = verify_credentials('testuser', 'testpass')
     assert result is False
 
@@ -97,44 +92,65 @@ def test_verify_credentials_exception(mock_get_secret):
 # UI Route Tests
 # ============================================================================
 
-@pytest.mark.skip(reason="Template loading issues in test environment")
-def test_ui_login_page(client):
-    """Test login page renders."""
-    response = client.get("/ui/login")
-    assert response.status_code == 200
-    assert b"Login" in response.content or b"login" in response.content
+class TestUITemplates:
+    """Rendered UI pages."""
 
+    pytestmark = pytest.mark.skip(reason="Template loading issues in test environment")
 
-@pytest.mark.skip(reason="Fixture dependency issues with mock_secrets_fixture")
-def test_ui_login_success(client, mock_secrets_fixture):
-    """Test successful login via UI."""
-    response = client.post(
-        "/ui/login",
-        data={"username": "testuser", "password": "testpass"},
-        follow_redirects=False
-    )
-    
-    assert response.status_code == 302
-    assert response.headers["location"] == "/ui/verify"
-    assert SESSION_COOKIE_NAME in response.cookies
+    def test_ui_login_page(self, client):
+        """Test login page renders."""
+        response = client.get("/ui/login")
+        assert response.status_code == 200
+        assert b"Login" in response.content or b"login" in response.content
 
+    def test_ui_verify_page_authenticated(self, client, session_cookie):
+        """Test verify page renders for authenticated user."""
+        client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
 
-@pytest.mark.skip(reason="Fixture dependency issues with mock_secrets_fixture")
-def test_ui_login_failure(client, mock_secrets_fixture):
-    """Test failed login via UI."""
-    response = client.post(
-        "/ui/login",
-        data={"username": "wronguser", "password": "wrongpass"}
-    )
-    
-    assert response.status_code == 200
-    assert b"Invalid" in response.content or b"invalid" in response.content
+        response = client.get("/ui/verify")
+        assert response.status_code == 200
+        assert b"Verification" in response.content or b"Verify" in response.content
+
+    def test_ui_batch_page_authenticated(self, client, session_cookie):
+        """Test batch page renders for authenticated user."""
+        client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
+
+        response = client.get("/ui/batch")
+        assert response.status_code == 200
+        assert b"Batch" in response.content or b"batch" in response.content
+
+
+class TestUILogin:
+    """UI login form against (mocked) Secrets Manager."""
+
+    pytestmark = pytest.mark.skip(reason="Fixture dependency issues with mock_secrets_fixture")
+
+    def test_ui_login_success(self, client, mock_secrets_fixture):
+        """Test successful login via UI."""
+        response = client.post(
+            "/ui/login",
+            data={"username": "testuser", "password": "testpass"},
+            follow_redirects=False
+        )
+
+        assert response.status_code == 302
+        assert response.headers["location"] == "/ui/verify"
+        assert SESSION_COOKIE_NAME in response.cookies
 
+    def test_ui_login_failure(self, client, mock_secrets_fixture):
+        """Test failed login via UI."""
+        response = client.post(
+            "/ui/login",
+            data={"username": "wronguser", "password": "wrongpass"}
+        )
 
-def test_ui_logout(client):
+        assert response.status_code == 200
+        assert b"Invalid" in response.content or b"invalid" in response.content
+
+
+def test_ui_logout(client, session_cookie):
     """Test logout deletes cookie and redirects."""
-    # Create a session cookie first
-    session_cookie = create_session_cookie("testuser")
+    # Start from a valid session
     client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
     
     # Logout
@@ -154,17 +170,6 @@ def test_ui_verify_page_unauthenticated(client):
     assert response.headers["Location"] == "/ui/login"
 
 
-@pytest.mark.skip(reason="Template loading issues in test environment")
-def test_ui_verify_page_authenticated(client):
-    """Test verify page renders for authenticated user."""
-    session_cookie = create_session_cookie("testuser")
-    client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
-    
-    response = client.get("/ui/verify")
-    assert response.status_code == 200
-    assert b"Verification" in response.content or b"Verify" in response.content
-
-
 def test_ui_batch_page_unauthenticated(client):
     """Test batch page redirects to login when unauthenticated."""
     response = client.get("/ui/batch", follow_redirects=False)
@@ -172,55 +177,10 @@ def test_ui_batch_page_unauthenticated(client):
     assert response.headers["Location"] == "/ui/login"
 
 
-@pytest.mark.skip(reason="Template loading issues in test environment")
-def test_ui_batch_page_authenticated(client):
-    """Test batch page renders for authenticated user."""
-    session_cookie = create_session_cookie("testuser")
-    client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
-    
-    response = client.get("/ui/batch")
-    assert response.status_code == 200
-    assert b"Batch" in response.content or b"batch" in response.content
-
-
 # ============================================================================
 # API Endpoint Authentication Tests
 # ============================================================================
 
-@pytest.fixture
-def sample_image_bytes(project_root):
-    """Load sample image as bytes."""
-    good_label_path = project_root / "samples" / "label_good_001.jpg"
-    if not good_label_path.exists():
-        pytest.skip(f"Sample image not found: {good_label_path}")
-    
-    with open(good_label_path, 'rb') as f:
-        return f.read()
-
-
-@pytest.fixture
-def sample_batch_zip(project_root):
-    """Create a sample batch ZIP file."""
-    import zipfile
-    import io
-    
-    samples_dir = project_root / "samples"
-    if not samples_dir.exists():
-        pytest.skip(f"Samples directory not found: {samples_dir}")
-    
-    good_labels = sorted(samples_dir.glob("label_good_*.jpg"))[:3]
-    if len(good_labels) < 3:
-        pytest.skip("Not enough sample images")
-    
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w') as zf:
-        for label_path in good_labels:
-            zf.write(label_path, arcname=label_path.name)
-    
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
-
-
 def test_verify_endpoint_requires_auth(client, sample_image_bytes):
     """Test /verify endpoint requires authentication."""
     response = client.post(
@@ -245,124 +205,89 @@ def test_batch_endpoint_requires_auth(client, sample_batch_zip):
 # Host Restriction Tests
 # ============================================================================
 
-def test_host_restriction_blocks_unauthorized():
-    """Test that unauthorized hosts are blocked."""
-    from middleware import HostCheckMiddleware
-    from starlette.applications import Starlette
-    from starlette.responses import PlainTextResponse
-    from starlette.routing import Route
-    
-    # Create simple app
-    async def homepage(request):
-        return PlainTextResponse("OK")
-    
-    test_app = Starlette(routes=[Route("/", homepage)])
-    test_app.add_middleware(HostCheckMiddleware, allowed_hosts=["allowed.com"])
-    
-    client = TestClient(test_app)
-    
-    # Request with unauthorized host should be blocked
-    response = client.get("/", headers={"Host": "unauthorized.com"})
-    assert response.status_code == 403
-
-
-def test_host_restriction_allows_authorized():
-    """Test that authorized hosts are allowed."""
+@pytest.fixture(scope="module")
+def host_client():
+    """Client for a minimal app behind HostCheckMiddleware (allows allowed.com)."""
     from middleware import HostCheckMiddleware
     from starlette.applications import Starlette
     from starlette.responses import PlainTextResponse
     from starlette.routing import Route
     
-    # Create simple app
-    async def homepage(request):
+    async def ok(request):
         return PlainTextResponse("OK")
     
-    test_app = Starlette(routes=[Route("/", homepage)])
+    test_app = Starlette(routes=[Route("/", ok), Route("/health", ok)])
     test_app.add_middleware(HostCheckMiddleware, allowed_hosts=["allowed.com"])
     
-    client = TestClient(test_app)
-    
-    # Request with authorized host should pass
-    response = client.get("/", headers={"Host": "allowed.com"})
-    assert response.status_code == 200
+    return TestClient(test_app)
 
 
-def test_host_restriction_allows_health():
-    """Test that /health endpoint is always accessible."""
-    from middleware import HostCheckMiddleware
-    from starlette.applications import Starlette
-    from starlette.responses import PlainTextResponse
-    from starlette.routing import Route
-    
-    # Create simple app
-    async def health(request):
-        return PlainTextResponse("OK")
-    
-    test_app = Starlette(routes=[Route("/health", health)])
-    test_app.add_middleware(HostCheckMiddleware, allowed_hosts=["allowed.com"])
-    
-    client = TestClient(test_app)
-    
-    # Health check should work from any host
-    response = client.get("/health", headers={"Host": "unauthorized.com"})
-    assert response.status_code == 200
+@pytest.mark.parametrize("host,path,expected_status", [
+    ("unauthorized.com", "/", 403),       # unauthorized hosts are blocked
+    ("allowed.com", "/", 200),            # authorized hosts are allowed
+    ("unauthorized.com", "/health", 200), # /health is always accessible
+], ids=["blocks_unauthorized", "allows_authorized", "allows_health"])
+def test_host_restriction(host_client, host, path, expected_status):
+    """Test HostCheckMiddleware host allow-listing."""
+    response = host_client.get(path, headers={"Host": host})
+    assert response.status_code == expected_status
 
 
 # ============================================================================
 # Secrets Manager Tests
 # ============================================================================
 
-@pytest.mark.skip(reason="Module import path issues in Docker test environment")
-@patch('boto3.client')
-def test_get_secret_success(mock_boto_client):
-    """Test successful secret retrieval."""
-    import app.aws_secrets
-    
-    # Clear cache
-    app.aws_secrets.get_secret.cache_clear()
-    
-    # Mock Secrets Manager response
-    mock_sm = MagicMock()
-    mock_sm.get_secret_value.return_value = {'SecretString': 'test_value'}
-    mock_boto_client.return_value = mock_sm
-    
-    result = app.aws_secrets.get_secret('TTB_DEFAULT_USER')
-    assert result == 'test_value'
-    mock_sm.get_secret_value.assert_called_once_with(SecretId='TTB_DEFAULT_USER')
+class TestSecretsManager:
+    """aws_secrets module."""
 
+    pytestmark = pytest.mark.skip(reason="Module import path issues in Docker test environment")
 
-@pytest.mark.skip(reason="Module import path issues in Docker test environment")
-@patch('boto3.client')
-def test_get_secret_fallback_to_env(mock_boto_client, monkeypatch):
-    """Test secret falls back to environment variable."""
-    import app.aws_secrets
-    
-    # Clear cache
-    app.aws_secrets.get_secret.cache_clear()
-    
-    # Mock Secrets Manager failure
-    mock_sm = MagicMock()
-    mock_sm.get_secret_value.side_effect = Exception("Secrets Manager unavailable")
-    mock_boto_client.return_value = mock_sm
-    
-    # Set environment variable
-    monkeypatch.setenv('TTB_DEFAULT_USER', 'env_user')
-    
-    result = app.aws_secrets.get_secret('TTB_DEFAULT_USER')
-    assert result == 'env_user'
+    @patch('boto3.client')
+    def test_get_secret_success(self, mock_boto_client):
+        """Test successful secret retrieval."""
+        import app.aws_secrets
 
+        # Clear cache
+        app.aws_secrets.get_secret.cache_clear()
 
-@pytest.mark.skip(reason="Module import path issues in Docker test environment")
-@patch('app.aws_secrets.get_secret')
-def test_get_ui_credentials(mock_get_secret):
-    """Test getting UI credentials."""
-    import app.aws_secrets
-    
-    mock_get_secret.side_effect = lambda name: {
-        'TTB_DEFAULT_USER': 'testuser',
-        'TTB_DEFAULT_PASS': 'testpass'
-    }[name]
-    
-    username, password = app.aws_secrets.get_ui_credentials()
-    assert username == 'testuser'
-    assert password == 'testpass'
+        # Mock Secrets Manager response
+        mock_sm = MagicMock()
+        mock_sm.get_secret_value.return_value = {'SecretString': 'test_value'}
+        mock_boto_client.return_value = mock_sm
+
+        result = app.aws_secrets.get_secret('TTB_DEFAULT_USER')
+        assert result == 'test_value'
+        mock_sm.get_secret_value.assert_called_once_with(SecretId='TTB_DEFAULT_USER')
+
+    @patch('boto3.client')
+    def test_get_secret_fallback_to_env(self, mock_boto_client, monkeypatch):
+        """Test secret falls back to environment variable."""
+        import app.aws_secrets
+
+        # Clear cache
+        app.aws_secrets.get_secret.cache_clear()
+
+        # Mock Secrets Manager failure
+        mock_sm = MagicMock()
+        mock_sm.get_secret_value.side_effect = Exception("Secrets Manager unavailable")
+        mock_boto_client.return_value = mock_sm
+
+        # Set environment variable
+        monkeypatch.setenv('TTB_DEFAULT_USER', 'env_user')
+
+        result = app.aws_secrets.get_secret('TTB_DEFAULT_USER')
+        assert result == 'env_user'
+
+    @patch('app.aws_secrets.get_secret')
+    def test_get_ui_credentials(self, mock_get_secret):
+        """Test getting UI credentials."""
+        import app.aws_secrets
+
+        mock_get_secret.side_effect = lambda name: {
+            'TTB_DEFAULT_USER': 'testuser',
+            'TTB_DEFAULT_PASS': 'testpass'
+        }[name]
+
+        username, password = app.aws_secrets.get_ui_credentials()
+        assert username == 'testuser'
+        assert password == 'testpass'
@@ -1,14 +1,13 @@
 """API tests for FastAPI endpoints."""
+import asyncio
 import pytest
 import json
 import zipfile
 import io
+import threading
+import time
 from pathlib import Path
-from unittest.mock import patch, Mock
 
-from fastapi.testclient import TestClient
-
-from api import app
 from config import get_settings
 
 
@@ -16,41 +15,13 @@ from config import get_settings
 # Fixtures
 # ============================================================================
 
-@pytest.fixture
-def client():
-    """FastAPI test client."""
-    return TestClient(app)
-
-
-@pytest.fixture
-def authenticated_client(client):
-    """
-    FastAPI test client with authenticated session.
-    
-    Creates a session and adds the session cookie to the client.
-    """
-    from auth import create_session_cookie, SESSION_COOKIE_NAME
-    
-    # Create a session for test user (no AWS secrets needed - just a session)
-    session_cookie = create_session_cookie("testuser")
-    
-    # Add session cookie to client
-    client.cookies.set(SESSION_COOKIE_NAME, session_cookie)
-    
-    return client
+@pytest.fixture(scope="session")
+def settings():
+    """Application settings, looked up once per session."""
+    return get_settings()
 
 
-@pytest.fixture
-def sample_image_bytes(good_label_path):
-    """Load sample image as bytes."""
-    if not good_label_path.exists():
-        pytest.skip(f"Sample image not found: {good_label_path}")
-    
-    with open(good_label_path, 'rb') as f:
-        return f.read()
-
-
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_ground_truth_json():
     """Sample ground truth as JSON string."""
     return json.dumps({
@@ -62,44 +33,17 @@ def sample_ground_truth_json():
     })
 
 
-@pytest.fixture
-def sample_batch_zip(samples_dir):
-    """Create a sample batch ZIP file with 3 images."""
-    if not samples_dir.exists():
-        pytest.skip(f"Samples directory not found: {samples_dir}")
-    
-    # Find first 3 good labels
-    good_labels = sorted(samples_dir.glob("label_good_*.jpg"))[:3]
-    if len(good_labels) < 3:
-        pytest.skip("Not enough sample images for batch test")
-    
-    # Create ZIP in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for label_path in good_labels:
-            # Add image
-            zf.write(label_path, arcname=label_path.name)
-            
-            # Add corresponding JSON if exists
-            json_path = label_path.with_suffix('.json')
-            if json_path.exists():
-                zf.write(json_path, arcname=json_path.name)
-    
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
-
-
-@pytest.fixture
+@pytest.fixture(scope="session")
 def invalid_zip_bytes():
     """Create invalid ZIP file (just random bytes)."""
     return b"This is not a valid ZIP file content"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_zip_bytes():
     """Create empty ZIP file with no images."""
     zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zf:
         # Add a text file but no images
         zf.writestr("readme.txt", "No images here")
     
@@ -107,10 +51,9 @@ def empty_zip_bytes():
     return zip_buffer.getvalue()
 
 
-@pytest.fixture
-def large_image_bytes():
+@pytest.fixture(scope="session")
+def large_image_bytes(settings):
     """Create a fake large image (exceeds size limit)."""
-    settings = get_settings()
     # Create bytes larger than max_file_size_mb
     return b"x" * (settings.max_file_size_bytes + 1000)
 
@@ -143,13 +86,51 @@ MOCK_FULL_VALIDATION_RESULT = {
 }
 
 
-@patch('api.LabelValidator')
-def test_verify_success_no_ground_truth(mock_validator_class, authenticated_client, sample_image_bytes):
-    """Test single label verification without ground truth (structural only)."""
-    mock_validator = Mock()
-    mock_validator.validate_label.return_value = MOCK_COMPLIANT_RESULT
-    mock_validator_class.return_value = mock_validator
+class _StubValidator:
+    """
+    Stand-in for api.LabelValidator: the instance replaces the class, so
+    every construction returns it.  validate_label returns (a copy of) or
+    raises ``result``; a list gives one outcome per call, in call order.
+    Batch jobs call it from several threads, so calls are recorded under a lock.
+    """
+
+    def __init__(self):
+        self.result = MOCK_COMPLIANT_RESULT
+        self.constructed = 0
+        self.timeouts = []
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        self.constructed += 1
+        self.timeouts.append(kwargs.get("timeout"))
+        return self
+
+    def validate_label(self, *args, **kwargs):
+        with self._lock:
+            self.calls.append((args, kwargs))
+            call_index = len(self.calls) - 1
+        result = self.result
+        if isinstance(result, list):
+            result = result[call_index]
+        if isinstance(result, Exception):
+            raise result
+        return dict(result)
 
+
+@pytest.fixture
+def stub_validator(monkeypatch):
+    """Install a _StubValidator as api.LabelValidator for one test."""
+    import api
+    stub = _StubValidator()
+    monkeypatch.setattr(api, "LabelValidator", stub)
+    api._validator_for.cache_clear()
+    yield stub
+    api._validator_for.cache_clear()
+
+
+def test_verify_success_no_ground_truth(stub_validator, authenticated_client, sample_image_bytes):
+    """Test single label verification without ground truth (structural only)."""
     response = authenticated_client.post(
         "/verify",
         files={"image": ("label.jpg", sample_image_bytes, "image/jpeg")}
@@ -168,12 +149,9 @@ def test_verify_success_no_ground_truth(mock_validator_class, authenticated_clie
     assert data["validation_level"] == "STRUCTURAL_ONLY"
 
 
-@patch('api.LabelValidator')
-def test_verify_success_with_ground_truth(mock_validator_class, authenticated_client, sample_image_bytes, sample_ground_truth_json):
+def test_verify_success_with_ground_truth(stub_validator, authenticated_client, sample_image_bytes, sample_ground_truth_json):
     """Test single label verification with ground truth (full validation)."""
-    mock_validator = Mock()
-    mock_validator.validate_label.return_value = MOCK_FULL_VALIDATION_RESULT
-    mock_validator_class.return_value = mock_validator
+    stub_validator.result = MOCK_FULL_VALIDATION_RESULT
 
     response = authenticated_client.post(
         "/verify",
@@ -187,12 +165,10 @@ def test_verify_success_with_ground_truth(mock_validator_class, authenticated_cl
     assert "accuracy" in data["validation_results"]
 
 
-@patch('api.LabelValidator')
-def test_verify_with_ollama_backend(mock_validator_class, authenticated_client, sample_image_bytes):
+def test_verify_with_ollama_backend(stub_validator, authenticated_client, sample_image_bytes):
     """Test single label verification (uses Ollama as the only backend)."""
-    # Mock the validator to avoid actual Ollama call
-    mock_validator = Mock()
-    mock_validator.validate_label.return_value = {
+    # Stub the validator to avoid actual Ollama call
+    stub_validator.result = {
         "status": "COMPLIANT",
         "validation_level": "STRUCTURAL_ONLY",
         "extracted_fields": {
@@ -208,7 +184,6 @@ def test_verify_with_ollama_backend(mock_validator_class, authenticated_client,
         "warnings": [],
         "processing_time_seconds": 1.5
     }
-    mock_validator_class.return_value = mock_validator
     
     response = authenticated_client.post(
         "/verify",
@@ -219,8 +194,36 @@ def test_verify_with_ollama_backend(mock_validator_class, authenticated_client,
     data = response.json()
     assert data["status"] == "COMPLIANT"
     
-    # Verify validator was called (now without ocr_backend parameter)
-    mock_validator_class.assert_called_once()
+    # Verify validator was constructed (now without ocr_backend parameter)
+    assert stub_validator.constructed == 1
+
+
+def test_validator_shared_per_timeout(stub_validator):
+    """Test requests with the same timeout reuse one validator."""
+    import api
+
+    assert api.get_validator(30) is api.get_validator(30)
+    assert stub_validator.constructed == 1
+    api.get_validator(60)
+    assert stub_validator.constructed == 2
+
+
+def test_validator_uses_exact_timeout(stub_validator):
+    """Test the requested timeout reaches the validator unchanged."""
+    import api
+
+    for timeout in (31, 45, 10_000):
+        api.get_validator(timeout)
+    assert stub_validator.timeouts == [31, 45, 10_000]
+
+
+def test_validator_cache_bounded(stub_validator):
+    """Test distinct timeouts cannot grow the validator cache without limit."""
+    import api
+
+    for timeout in range(1, api._MAX_CACHED_VALIDATORS + 6):
+        api.get_validator(timeout)
+    assert api._validator_for.cache_info().currsize == api._MAX_CACHED_VALIDATORS
 
 
 def test_verify_with_custom_timeout(authenticated_client, sample_image_bytes):
@@ -271,13 +274,10 @@ def test_verify_missing_image(authenticated_client):
     assert response.status_code == 422  # Validation error
 
 
-@patch('api.LabelValidator')
-def test_verify_ocr_failure(mock_validator_class, authenticated_client, sample_image_bytes):
+def test_verify_ocr_failure(stub_validator, authenticated_client, sample_image_bytes):
     """Test verification when OCR processing fails."""
-    # Mock validator to raise an exception
-    mock_validator = Mock()
-    mock_validator.validate_label.side_effect = Exception("OCR processing failed")
-    mock_validator_class.return_value = mock_validator
+    # Validator raises
+    stub_validator.result = Exception("OCR processing failed")
     
     response = authenticated_client.post(
         "/verify",
@@ -304,13 +304,8 @@ def _poll_batch_job(client, job_id: str, max_polls: int = 10):
     pytest.fail(f"Batch job {job_id} did not reach terminal state after {max_polls} polls")
 
 
-@patch('api.LabelValidator')
-def test_batch_success(mock_validator_class, authenticated_client, sample_batch_zip):
+def test_batch_success(stub_validator, authenticated_client, sample_batch_zip):
     """Test batch verification with valid ZIP file."""
-    mock_validator = Mock()
-    mock_validator.validate_label.return_value = MOCK_COMPLIANT_RESULT
-    mock_validator_class.return_value = mock_validator
-
     response = authenticated_client.post(
         "/verify/batch",
         files={"batch_file": ("batch.zip", sample_batch_zip, "application/zip")}
@@ -342,12 +337,9 @@ def test_batch_success(mock_validator_class, authenticated_client, sample_batch_
         assert "image_path" in result
 
 
-@patch('api.LabelValidator')
-def test_batch_with_ground_truth(mock_validator_class, authenticated_client, sample_batch_zip):
+def test_batch_with_ground_truth(stub_validator, authenticated_client, sample_batch_zip):
     """Test batch verification with ground truth JSON files in ZIP."""
-    mock_validator = Mock()
-    mock_validator.validate_label.return_value = MOCK_FULL_VALIDATION_RESULT
-    mock_validator_class.return_value = mock_validator
+    stub_validator.result = MOCK_FULL_VALIDATION_RESULT
 
     response = authenticated_client.post(
         "/verify/batch",
@@ -391,6 +383,42 @@ def test_batch_empty_zip(authenticated_client, empty_zip_bytes):
     assert "No image files found" in data["detail"]
 
 
+def _zip_of(*members, compression=zipfile.ZIP_STORED):
+    """Build an in-memory ZIP from (name, bytes) pairs."""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', compression) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return zip_buffer.getvalue()
+
+
+def test_batch_rejects_path_traversal(authenticated_client):
+    """Test a member that would extract outside the job directory is rejected."""
+    response = authenticated_client.post(
+        "/verify/batch",
+        files={"batch_file": ("batch.zip", _zip_of(("../escape.jpg", b"\xff\xd8\xff\xe0")), "application/zip")}
+    )
+
+    assert response.status_code == 400
+    assert "Invalid file path" in response.json()["detail"]
+
+
+def test_batch_rejects_oversized_member(authenticated_client, monkeypatch):
+    """Test a member whose uncompressed size exceeds the per-file limit is rejected."""
+    import api
+    monkeypatch.setattr(api.settings, "max_file_size_mb", 1)
+    # Compresses to a few KB but inflates past 1 MB
+    zip_bytes = _zip_of(("label.jpg", b"\x00" * (2 * 1024 * 1024)), compression=zipfile.ZIP_DEFLATED)
+
+    response = authenticated_client.post(
+        "/verify/batch",
+        files={"batch_file": ("batch.zip", zip_bytes, "application/zip")}
+    )
+
+    assert response.status_code == 413
+    assert "too large" in response.json()["detail"]
+
+
 def test_batch_invalid_file_type(authenticated_client):
     """Test batch verification with non-ZIP file."""
     response = authenticated_client.post(
@@ -403,29 +431,27 @@ def test_batch_invalid_file_type(authenticated_client):
     assert ("Invalid file type" in data["detail"] or "ZIP archive" in data["detail"])
 
 
-@pytest.mark.parametrize("num_images", [51, 100])
-def test_batch_too_many_images(authenticated_client, samples_dir, num_images):
-    """Test batch verification with too many images."""
-    settings = get_settings()
-    
-    # Skip if we don't have enough samples
-    good_labels = list(samples_dir.glob("label_good_*.jpg"))
-    if len(good_labels) < 10:
-        pytest.skip("Not enough sample images for this test")
+@pytest.fixture(scope="session")
+def oversized_batch_zip(settings):
+    """
+    ZIP with one image more than max_batch_size (built once per session).
     
-    # Create ZIP with more images than allowed
+    The image count is checked before any image is decoded, so each member
+    is just a JPEG SOI marker; the archive stays a few KB.
+    """
     zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Add same images multiple times with different names
-        for i in range(min(num_images, settings.max_batch_size + 1)):
-            label_path = good_labels[i % len(good_labels)]
-            zf.write(label_path, arcname=f"label_{i:03d}.jpg")
-    
-    zip_buffer.seek(0)
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for i in range(settings.max_batch_size + 1):
+            zf.writestr(f"label_{i:03d}.jpg", b"\xff\xd8\xff\xe0")
     
+    return zip_buffer.getvalue()
+
+
+def test_batch_rejects_over_limit(authenticated_client, oversized_batch_zip):
+    """Test batch verification with one image more than max_batch_size."""
     response = authenticated_client.post(
         "/verify/batch",
-        files={"batch_file": ("batch.zip", zip_buffer.getvalue(), "application/zip")}
+        files={"batch_file": ("batch.zip", oversized_batch_zip, "application/zip")}
     )
     
     assert response.status_code == 400
@@ -433,6 +459,29 @@ def test_batch_too_many_images(authenticated_client, samples_dir, num_images):
     assert "Too many images" in data["detail"]
 
 
+def test_save_upload_file_streams_in_chunks(tmp_path, monkeypatch):
+    """Test an upload larger than one chunk is copied to disk intact."""
+    import api
+    from fastapi import UploadFile
+
+    monkeypatch.setattr(api, "UPLOAD_CHUNK_SIZE", 4)
+    dest = tmp_path / "upload.bin"
+    asyncio.run(api.save_upload_file(UploadFile(io.BytesIO(b"0123456789")), dest))
+    assert dest.read_bytes() == b"0123456789"
+
+
+def test_save_upload_file_rejects_oversized(tmp_path):
+    """Test an upload past max_bytes is rejected with 413 and not left on disk."""
+    import api
+    from fastapi import HTTPException, UploadFile
+
+    dest = tmp_path / "upload.bin"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(api.save_upload_file(UploadFile(io.BytesIO(b"x" * 10)), dest, max_bytes=9))
+    assert exc.value.status_code == 413
+    assert not dest.exists()
+
+
 # ============================================================================
 # CORS & Documentation Tests
 # ============================================================================
@@ -548,13 +597,8 @@ def test_verify_png_rejected(authenticated_client, sample_image_bytes):
     assert "Invalid file type" in data["detail"]
 
 
-@patch('api.LabelValidator')
-def test_batch_with_custom_timeout(mock_validator_class, authenticated_client, sample_batch_zip):
+def test_batch_with_custom_timeout(stub_validator, authenticated_client, sample_batch_zip):
     """Test batch verification with custom timeout."""
-    mock_validator = Mock()
-    mock_validator.validate_label.return_value = MOCK_COMPLIANT_RESULT
-    mock_validator_class.return_value = mock_validator
-
     response = authenticated_client.post(
         "/verify/batch",
         files={"batch_file": ("batch.zip", sample_batch_zip, "application/zip")},
@@ -569,29 +613,86 @@ def test_batch_with_custom_timeout(mock_validator_class, authenticated_client, s
     assert data["summary"]["total"] == 3
 
 
-@patch('api.LabelValidator')
-def test_batch_partial_failure(mock_validator_class, authenticated_client, sample_batch_zip):
+def test_batch_job_results_in_input_order(stub_validator, tmp_path, monkeypatch):
+    """Test concurrently validated images are recorded in input order."""
+    import api
+    monkeypatch.setattr(api.settings, "batch_max_concurrency", 4)
+
+    image_files = []
+    for i in range(6):
+        p = tmp_path / f"label_{i}.jpg"
+        p.write_bytes(b"\xff\xd8\xff\xe0")
+        image_files.append(p)
+
+    def validate_label(image_path, ground_truth=None, **kwargs):
+        # Earlier images finish last
+        time.sleep(0.01 * (len(image_files) - int(Path(image_path).stem[-1])))
+        return dict(MOCK_COMPLIANT_RESULT)
+
+    stub_validator.validate_label = validate_label
+    job_id = api.job_manager.create_job(total_images=len(image_files))
+    try:
+        api.process_batch_job(job_id, image_files, ocr_timeout=30, correlation_id="test")
+        job = api.job_manager.get_job(job_id)
+        assert [r["image_path"] for r in job.results] == [p.name for p in image_files]
+        assert job.summary["total"] == len(image_files)
+        # Wall-clock total, not the sum of the stubbed per-image times
+        assert job.summary["total_processing_time_seconds"] != pytest.approx(
+            MOCK_COMPLIANT_RESULT["processing_time_seconds"] * len(image_files)
+        )
+    finally:
+        api.job_manager.delete_job(job_id)
+
+
+def test_sequential_batch_reads_next_image_during_validation(stub_validator, tmp_path, monkeypatch):
+    """Test with concurrency 1 the next image is read while the current one is validated."""
+    import api
+    import label_validator
+    monkeypatch.setattr(api.settings, "batch_max_concurrency", 1)
+
+    image_files = []
+    for i in range(3):
+        p = tmp_path / f"label_{i}.jpg"
+        p.write_bytes(bytes([i]) * 4)
+        image_files.append(p)
+
+    read_started = {p: threading.Event() for p in image_files}
+    real_read = label_validator._read_image_bytes
+
+    def read_image_bytes(path):
+        read_started[path].set()
+        return real_read(path)
+
+    monkeypatch.setattr(label_validator, "_read_image_bytes", read_image_bytes)
+
+    overlapped, received = [], []
+
+    def validate_label(image_path, ground_truth=None, image_bytes=None):
+        i = image_files.index(Path(image_path))
+        received.append(image_bytes)
+        if i + 1 < len(image_files):
+            overlapped.append(read_started[image_files[i + 1]].wait(timeout=2))
+        return dict(MOCK_COMPLIANT_RESULT)
+
+    stub_validator.validate_label = validate_label
+    job_id = api.job_manager.create_job(total_images=len(image_files))
+    try:
+        api.process_batch_job(job_id, image_files, ocr_timeout=30, correlation_id="test")
+    finally:
+        api.job_manager.delete_job(job_id)
+
+    assert overlapped == [True, True]
+    assert received == [p.read_bytes() for p in image_files]
+
+
+def test_batch_partial_failure(stub_validator, authenticated_client, sample_batch_zip):
     """Test batch processing when some images fail (should return partial results)."""
-    # Mock validator to fail on second image
-    mock_validator = Mock()
-    call_count = [0]
-
-    def side_effect(*args, **kwargs):
-        call_count[0] += 1
-        if call_count[0] == 2:
-            raise Exception("Processing failed for this image")
-        return {
-            "status": "COMPLIANT",
-            "validation_level": "STRUCTURAL_ONLY",
-            "extracted_fields": {},
-            "validation_results": {"structural": [], "accuracy": []},
-            "violations": [],
-            "warnings": [],
-            "processing_time_seconds": 1.0
-        }
-
-    mock_validator.validate_label.side_effect = side_effect
-    mock_validator_class.return_value = mock_validator
+    # Validator fails on second image
+    stub_validator.result = [
+        MOCK_COMPLIANT_RESULT,
+        Exception("Processing failed for this image"),
+        MOCK_COMPLIANT_RESULT,
+    ]
 
     response = authenticated_client.post(
         "/verify/batch",
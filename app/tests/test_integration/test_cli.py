@@ -1,11 +1,39 @@
 """Integration tests - CLI behavior."""
 import subprocess
+import sys
 import json
 import pytest
 
 
-def test_cli_help():
+@pytest.fixture(scope="session")
+def verify_label_module():
+    """The CLI module, imported once per session."""
+    import verify_label
+    return verify_label
+
+
+@pytest.fixture
+def run_cli(verify_label_module, monkeypatch, capsys):
+    """Run verify_label.main() in-process; returns (exit_code, stdout, stderr)."""
+    def _run(*args):
+        monkeypatch.setattr(sys, "argv", ["verify_label.py", *args])
+        with pytest.raises(SystemExit) as exc:
+            verify_label_module.main()
+        out, err = capsys.readouterr()
+        return exc.value.code, out, err
+    return _run
+
+
+def test_cli_help(run_cli):
     """Test CLI help command."""
+    code, out, _ = run_cli("--help")
+    assert code == 0
+    assert "usage:" in out.lower()
+
+
+@pytest.mark.slow
+def test_cli_help_subprocess():
+    """Test the real script entry point runs as a separate process."""
     result = subprocess.run(
         ["python3", "verify_label.py", "--help"],
         capture_output=True,
@@ -15,17 +43,13 @@ def test_cli_help():
     assert "usage:" in result.stdout.lower()
 
 
-def test_cli_missing_file():
+def test_cli_missing_file(run_cli):
     """Test CLI with missing file."""
-    result = subprocess.run(
-        ["python3", "verify_label.py", "nonexistent.jpg"],
-        capture_output=True,
-        text=True
-    )
-    assert result.returncode != 0
+    code, _, _ = run_cli("nonexistent.jpg")
+    assert code != 0
 
 
-def test_cli_with_sample(good_label_path):
+def test_cli_with_sample(run_cli, good_label_path):
     """Test CLI produces valid JSON output for a real sample image.
 
     Ollama is not available in the test environment, so the result may have
@@ -35,22 +59,17 @@ def test_cli_with_sample(good_label_path):
     if not good_label_path.exists():
         pytest.skip("Golden sample not available")
 
-    result = subprocess.run(
-        ["python3", "verify_label.py", str(good_label_path)],
-        capture_output=True,
-        text=True,
-        timeout=15,
-    )
+    _, out, err = run_cli(str(good_label_path))
 
     # CLI must produce output regardless of Ollama availability
-    assert result.stdout.strip(), (
-        f"CLI produced no stdout:\nstderr: {result.stderr}"
+    assert out.strip(), (
+        f"CLI produced no stdout:\nstderr: {err}"
     )
 
     try:
-        data = json.loads(result.stdout)
+        data = json.loads(out)
     except json.JSONDecodeError:
-        pytest.fail(f"CLI did not output valid JSON:\n{result.stdout}")
+        pytest.fail(f"CLI did not output valid JSON:\n{out}")
 
     assert "status" in data, "Result missing 'status' field"
     assert "extracted_fields" in data, "Result missing 'extracted_fields' field"
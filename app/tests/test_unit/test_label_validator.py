@@ -0,0 +1,135 @@
+"""Unit tests for label_validator.py"""
+import pytest
+from label_validator import LabelValidator, prefetch_images, _normalize_ground_truth
+from ocr_backends import OCRBackend
+
+
+class StubOCR(OCRBackend):
+    """OCR backend returning canned text and recording what it was given."""
+
+    def __init__(self, raw_text: str):
+        self.raw_text = raw_text
+        self.calls = []
+
+    def extract_text(self, image):
+        self.calls.append(image)
+        return {
+            'success': True,
+            'raw_text': self.raw_text,
+            'metadata': {'backend': 'stub', 'processing_time_seconds': 0.0}
+        }
+
+
+@pytest.fixture
+def label_image(tmp_path):
+    """A tiny JPEG-looking file on disk."""
+    p = tmp_path / "label.jpg"
+    p.write_bytes(b"\xff\xd8\xff\xe0" + b"\x00" * 100)
+    return p
+
+
+@pytest.fixture
+def validator_factory():
+    """Build a LabelValidator whose OCR backend is a StubOCR."""
+    def _make(raw_text):
+        validator = LabelValidator()
+        validator.ocr = StubOCR(raw_text)
+        return validator
+    return _make
+
+
+class TestValidateLabel:
+    """Test the validate_label orchestration."""
+
+    def test_ocr_receives_image_bytes(self, validator_factory, label_image, mock_ocr_text_good):
+        """Test the image is read once and passed to OCR as bytes."""
+        validator = validator_factory(mock_ocr_text_good)
+        validator.validate_label(str(label_image))
+        assert validator.ocr.calls == [label_image.read_bytes()]
+
+    def test_missing_image_returns_error(self, validator_factory, tmp_path, mock_ocr_text_good):
+        """Test a missing image produces an ERROR result without calling OCR."""
+        validator = validator_factory(mock_ocr_text_good)
+        result = validator.validate_label(str(tmp_path / "missing.jpg"))
+        assert result['status'] == 'ERROR'
+        assert 'Image not found' in result['error']
+        assert validator.ocr.calls == []
+
+    def test_compliant_structural(self, validator_factory, label_image, mock_ocr_text_good):
+        """Test a complete label is structurally compliant."""
+        validator = validator_factory(mock_ocr_text_good)
+        result = validator.validate_label(str(label_image))
+        assert result['status'] == 'COMPLIANT'
+        assert result['validation_level'] == 'STRUCTURAL_ONLY'
+        assert result['extracted_fields']['government_warning']['present'] is True
+
+    def test_non_numeric_abv_fails_field(self, validator_factory, label_image, mock_ocr_text_good):
+        """Test a non-numeric expected ABV is reported as a failed field, not raised."""
+        validator = validator_factory(mock_ocr_text_good)
+        result = validator.validate_label(str(label_image), {'abv': 'abc'})
+        abv = next(r for r in result['validation_results']['accuracy'] if r['field'] == 'abv')
+        assert abv['valid'] is False
+        assert abv['expected'] == 'abc'
+        assert result['status'] == 'NON_COMPLIANT'
+
+
+class TestPrefetchImages:
+    """Test batch image prefetching."""
+
+    def test_yields_paths_and_bytes_in_order(self, tmp_path):
+        """Test every image is yielded once, in order, with its contents."""
+        paths = []
+        for i in range(3):
+            p = tmp_path / f"label_{i}.jpg"
+            p.write_bytes(bytes([i]) * 10)
+            paths.append(p)
+        assert list(prefetch_images(paths)) == [(p, p.read_bytes()) for p in paths]
+
+    def test_unreadable_image_yields_none(self, tmp_path):
+        """Test a missing file yields None instead of raising."""
+        missing = tmp_path / "missing.jpg"
+        assert list(prefetch_images([missing])) == [(missing, None)]
+
+    def test_empty_batch(self):
+        """Test an empty batch yields nothing."""
+        assert list(prefetch_images([])) == []
+
+
+class TestNormalizeGroundTruth:
+    """Test ground truth canonicalization."""
+
+    def test_strips_strings_and_coerces_abv(self):
+        """Test whitespace is stripped and ABV strings become floats."""
+        gt = {'brand_name': '  Ridge & Co. ', 'abv': '7.5%', 'product_type': 'Hefeweizen'}
+        assert _normalize_ground_truth(gt) == {
+            'brand_name': 'Ridge & Co.',
+            'abv': 7.5,
+            'product_type': 'Hefeweizen'
+        }
+
+    def test_does_not_mutate_input(self):
+        """Test the caller's dict is left untouched."""
+        gt = {'abv': '7.5'}
+        _normalize_ground_truth(gt)
+        assert gt == {'abv': '7.5'}
+
+    def test_empty_is_none(self):
+        """Test missing or empty ground truth normalizes to None."""
+        assert _normalize_ground_truth(None) is None
+        assert _normalize_ground_truth({}) is None
+
+
+class TestCollectWarnings:
+    """Test warning collection."""
+
+    def test_missing_fields_warning(self, validator_factory, label_image):
+        """Test a warning is raised when two or more core fields are missing."""
+        validator = validator_factory("Ridge & Co.\nHefeweizen")
+        result = validator.validate_label(str(label_image))
+        assert any("missing fields" in w for w in result['warnings'])
+
+    def test_no_missing_fields_warning(self, validator_factory, label_image, mock_ocr_text_good):
+        """Test no OCR-quality warning for a complete label."""
+        validator = validator_factory(mock_ocr_text_good)
+        result = validator.validate_label(str(label_image))
+        assert not any("missing fields" in w for w in result['warnings'])
@@ -0,0 +1,270 @@
+"""Unit tests for ocr_backends.py"""
+import io
+import pytest
+from PIL import Image
+from unittest.mock import Mock
+import ocr_backends
+from ocr_backends import OllamaOCR, _downscale_image, _load_image_bytes
+
+
+def _tags_response(*names, status_code=200):
+    """Fake /api/tags HTTP response listing the given model names."""
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = {'models': [{'name': n} for n in names]}
+    response.content = (
+        b'{"models": [' + b', '.join(b'{"name": "%s"}' % n.encode() for n in names) + b']}'
+    )
+    return response
+
+
+class _CountingPath:
+    """Wraps a Path, counting exists() calls."""
+
+    def __init__(self, path):
+        self.path = path
+        self.exists_calls = 0
+
+    def exists(self):
+        self.exists_calls += 1
+        return self.path.exists()
+
+
+@pytest.fixture
+def backend():
+    """OllamaOCR instance pointed at a host that is never contacted."""
+    return OllamaOCR(host="http://ollama.test:11434")
+
+
+class TestCheckAvailability:
+    """Test Ollama availability probing."""
+
+    def test_model_available(self, backend):
+        """Test the configured model is found in /api/tags."""
+        backend._session.get = Mock(return_value=_tags_response("llama3.2-vision:latest"))
+        assert backend.check_availability() == (True, None)
+
+    def test_model_missing(self, backend):
+        """Test a missing model is reported with the available models."""
+        backend._session.get = Mock(return_value=_tags_response("llava:latest"))
+        available, error = backend.check_availability()
+        assert available is False
+        assert "llava" in error
+
+    def test_invalid_json(self, backend):
+        """Test a malformed tags body is reported rather than raised."""
+        response = _tags_response()
+        response.content = b"<html>"
+        response.json.side_effect = ValueError("bad json")
+        backend._session.get = Mock(return_value=response)
+        available, error = backend.check_availability()
+        assert available is False
+        assert "Invalid response" in error
+
+    def test_failed_probe_not_cached(self, backend):
+        """Test an HTTP error is retried on the next check."""
+        backend._session.get = Mock(side_effect=[_tags_response(status_code=500),
+                                                 _tags_response("llama3.2-vision")])
+        assert backend.check_availability()[0] is False
+        assert backend.check_availability() == (True, None)
+
+
+class TestResetClient:
+    """Test rebuilding the Ollama client after a transport failure."""
+
+    def test_reset_client_rebuilds(self):
+        """Test reset_client swaps in a new client with the same timeout."""
+        backend = OllamaOCR(host="http://ollama.test:11434", timeout=30)
+        stale = backend._client
+        backend.reset_client()
+        assert backend._client is not stale
+        assert backend._client._client.timeout.read == 30
+
+
+class TestEnsureAvailable:
+    """Test the TTL-cached sentinel availability check."""
+
+    @pytest.fixture
+    def sentinel(self, tmp_path, monkeypatch):
+        """Point the health sentinel at a temporary file."""
+        path = tmp_path / "HEALTHY"
+        monkeypatch.setattr(ocr_backends, "_SENTINEL_PATH", path)
+        return path
+
+    def test_missing_sentinel_raises(self, backend, sentinel):
+        """Test an absent sentinel reports Ollama as not ready."""
+        with pytest.raises(RuntimeError, match="not ready"):
+            backend._ensure_available()
+
+    def test_result_reused_within_ttl(self, backend, sentinel):
+        """Test the sentinel is not re-checked until the TTL expires."""
+        sentinel.touch()
+        backend._ensure_available()
+        sentinel.unlink()
+        backend._ensure_available()
+
+        backend._availability_expires_at = 0.0
+        with pytest.raises(RuntimeError):
+            backend._ensure_available()
+
+    def test_sentinel_stat_once_per_ttl(self, backend, sentinel, monkeypatch):
+        """Test repeated checks within the TTL stat the sentinel only once."""
+        sentinel.touch()
+        counting = _CountingPath(sentinel)
+        monkeypatch.setattr(ocr_backends, "_SENTINEL_PATH", counting)
+        backend._ensure_available()
+        backend._ensure_available()
+        assert counting.exists_calls == 1
+
+    def test_fresh_result_skips_check(self, backend, sentinel):
+        """Test extract_text does not re-check while a healthy result is fresh."""
+        sentinel.touch()
+        backend._ensure_available()
+        backend._ensure_available = Mock()
+        backend._client = Mock()
+        backend._client.chat.return_value = {'message': {'content': 'text'}}
+        assert backend.extract_text(b"label")['success'] is True
+        backend._ensure_available.assert_not_called()
+
+
+class TestWarmup:
+    """Test the optional model warmup."""
+
+    def test_loads_model(self, backend):
+        """Test warmup sends a one-token request that keeps the model resident."""
+        backend._ensure_available = Mock()
+        backend._client = Mock()
+        backend._warmup()
+        kwargs = backend._client.generate.call_args.kwargs
+        assert kwargs['keep_alive'] == -1
+        assert kwargs['options'] == {'num_predict': 1}
+
+    def test_unavailable_is_silent(self, backend):
+        """Test warmup gives up quietly when Ollama is not ready."""
+        backend._ensure_available = Mock(side_effect=RuntimeError("not ready"))
+        backend._client = Mock()
+        backend._warmup()
+        backend._client.generate.assert_not_called()
+
+
+class TestLoadImageBytes:
+    """Test the path-keyed image byte cache."""
+
+    def test_reread_after_modification(self, tmp_path):
+        """Test a rewritten file is not served from the cache."""
+        p = tmp_path / "label.jpg"
+        p.write_bytes(b"first")
+        st = p.stat()
+        assert _load_image_bytes(str(p), st.st_mtime_ns, st.st_size) == b"first"
+
+        p.write_bytes(b"second!")
+        st = p.stat()
+        assert _load_image_bytes(str(p), st.st_mtime_ns, st.st_size) == b"second!"
+
+
+def _jpeg(width, height):
+    """Encode a blank JPEG of the given size."""
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), 'white').save(out, format='JPEG')
+    return out.getvalue()
+
+
+class TestDownscaleImage:
+    """Test pre-inference image downscaling."""
+
+    def test_large_image_shrunk(self):
+        """Test the longest side is capped, keeping the aspect ratio."""
+        with Image.open(io.BytesIO(_downscale_image(_jpeg(3000, 1500)))) as img:
+            assert img.size == (ocr_backends._MAX_IMAGE_SIDE, ocr_backends._MAX_IMAGE_SIDE // 2)
+
+    def test_small_image_unchanged(self):
+        """Test images within bounds are passed through byte-for-byte."""
+        data = _jpeg(800, 600)
+        assert _downscale_image(data) is data
+
+    def test_unreadable_bytes_unchanged(self):
+        """Test non-image bytes are left for Ollama to reject."""
+        assert _downscale_image(b"not an image") == b"not an image"
+
+
+class TestResultCache:
+    """Test the content-hash OCR result cache."""
+
+    @pytest.fixture
+    def ready_backend(self, backend):
+        """Backend with availability and the Ollama client stubbed out."""
+        backend._ensure_available = Mock()
+        backend._client = Mock()
+        backend._client.chat.return_value = {'message': {'content': 'GOVERNMENT WARNING: ...'}}
+        return backend
+
+    def test_identical_bytes_hit_cache(self, ready_backend):
+        """Test a repeat call with the same image skips inference."""
+        first = ready_backend.extract_text(b"label-bytes")
+        second = ready_backend.extract_text(b"label-bytes")
+        assert first['success'] and second['raw_text'] == first['raw_text']
+        assert second['metadata']['cache_hit'] is True
+        assert 'cache_hit' not in first['metadata']
+        assert ready_backend._client.chat.call_count == 1
+
+    def test_cache_hit_returns_copy(self, ready_backend):
+        """Test mutating a cached result does not alter later hits."""
+        ready_backend.extract_text(b"label-bytes")
+        hit = ready_backend.extract_text(b"label-bytes")
+        hit['raw_text'] = 'edited'
+        hit['metadata']['model'] = 'edited'
+        again = ready_backend.extract_text(b"label-bytes")
+        assert again['raw_text'] == 'GOVERNMENT WARNING: ...'
+        assert again['metadata']['model'] == ready_backend.model
+
+    def test_different_bytes_miss_cache(self, ready_backend):
+        """Test a different image runs inference again."""
+        ready_backend.extract_text(b"label-a")
+        ready_backend.extract_text(b"label-b")
+        assert ready_backend._client.chat.call_count == 2
+
+    def test_failures_not_cached(self, ready_backend):
+        """Test a failed extraction is retried on the next call."""
+        ready_backend._client.chat.side_effect = [RuntimeError("timeout"),
+                                                  {'message': {'content': 'text'}}]
+        assert ready_backend.extract_text(b"label")['success'] is False
+        assert ready_backend.extract_text(b"label")['success'] is True
+
+    def test_timeout_flagged_as_connection_error(self, ready_backend):
+        """Test transport failures are marked so the worker can rebuild the client."""
+        import httpx
+        ready_backend._client.chat.side_effect = httpx.ReadTimeout("timed out")
+        result = ready_backend.extract_text(b"label")
+        assert result['success'] is False
+        assert result['connection_error'] is True
+
+    def test_other_errors_not_connection_errors(self, ready_backend):
+        """Test a model-side failure is not treated as a connection problem."""
+        ready_backend._client.chat.side_effect = ValueError("bad response")
+        assert ready_backend.extract_text(b"label")['connection_error'] is False
+
+    def test_missing_path_is_error_result(self, ready_backend, tmp_path):
+        """Test a missing image path returns a standard error result."""
+        result = ready_backend.extract_text(str(tmp_path / "missing.jpg"))
+        assert result['success'] is False
+        assert "Image not found" in result['error']
+        assert result['connection_error'] is False
+        assert result['metadata']['backend'] == 'ollama'
+        ready_backend._client.chat.assert_not_called()
+
+    def test_cache_disabled(self, ready_backend):
+        """Test use_cache=False always runs inference."""
+        ready_backend.use_cache = False
+        ready_backend.extract_text(b"label")
+        ready_backend.extract_text(b"label")
+        assert ready_backend._client.chat.call_count == 2
+
+    def test_concurrent_inserts_stay_bounded(self, ready_backend, monkeypatch):
+        """Test threads filling a full cache all succeed and never overflow it."""
+        from concurrent.futures import ThreadPoolExecutor
+        monkeypatch.setattr(ocr_backends, "_RESULT_CACHE_SIZE", 4)
+        images = [f"label-{i}".encode() for i in range(200)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(ready_backend.extract_text, images))
+        assert all(r['success'] for r in results)
+        assert len(ready_backend._cache) <= 4
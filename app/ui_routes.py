@@ -101,6 +101,8 @@ def create_thumbnail(image_path: Path, size: tuple = (100, 100)) -> str:
     
     try:
         with Image.open(image_path) as img:
+            # JPEG only: decode at the smallest DCT scale that is still >= size
+            img.draft("RGB", size)
             img.thumbnail(size, Image.Resampling.LANCZOS)
             buffer = BytesIO()
             img.save(buffer, format="JPEG", quality=85)
@@ -212,7 +214,7 @@ async def ui_verify_submit(
     timeout under load), we enqueue the job and immediately redirect to a
     polling page that shows a spinner until the worker completes it.
     """
-    from api import verify_queue
+    from api import verify_queue, save_upload_file
 
     # Validate image file
     if image.content_type not in ["image/jpeg", "image/jpg", "image/tiff"]:
@@ -260,9 +262,7 @@ async def ui_verify_submit(
         # browser may include) so the results page can display it correctly.
         original_name = Path(image.filename).name if image.filename else "image.jpg"
         image_dest = job_dir / original_name
-        content = await image.read()
-        with open(image_dest, "wb") as f:
-            f.write(content)
+        await save_upload_file(image, image_dest)
 
         job_id = verify_queue.enqueue(
             image_path=str(image_dest),
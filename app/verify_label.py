@@ -27,7 +27,7 @@ import os
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
-from label_validator import LabelValidator
+from label_validator import LabelValidator, prefetch_images
 
 
 def load_ground_truth(ground_truth_path: Optional[str]) -> Optional[Dict[str, Any]]:
@@ -91,8 +91,14 @@ def load_ground_truth(ground_truth_path: Optional[str]) -> Optional[Dict[str, An
 
 def validate_single_label(image_path: str,
                          ground_truth_path: Optional[str],
-                         verbose: bool = False) -> Dict[str, Any]:
-    """Validate a single label image."""
+                         verbose: bool = False,
+                         validator: Optional[LabelValidator] = None,
+                         image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """
+    Validate a single label image.
+
+    Batch callers pass a shared validator and the already-read image bytes.
+    """
     # Check if image exists
     if not os.path.exists(image_path):
         return {
@@ -112,16 +118,17 @@ def validate_single_label(image_path: str,
     ground_truth = load_ground_truth(ground_truth_path)
     
     # Initialize validator
-    if verbose:
-        print(f"Initializing Ollama OCR backend...", file=sys.stderr)
-    
-    validator = LabelValidator()
+    if validator is None:
+        if verbose:
+            print(f"Initializing Ollama OCR backend...", file=sys.stderr)
+        
+        validator = LabelValidator()
     
     # Validate
     if verbose:
         print(f"Processing {image_path}...", file=sys.stderr)
     
-    result = validator.validate_label(image_path, ground_truth)
+    result = validator.validate_label(image_path, ground_truth, image_bytes=image_bytes)
     
     # Add image path to result
     result['image_path'] = image_path
@@ -150,8 +157,10 @@ def validate_batch(directory: str,
     if verbose:
         print(f"Found {len(image_files)} images to process", file=sys.stderr)
     
-    # Process each image
-    for i, image_path in enumerate(sorted(image_files), 1):
+    # Process each image with one validator (the next image is read from disk
+    # while the current one is in OCR)
+    validator = LabelValidator()
+    for i, (image_path, image_bytes) in enumerate(prefetch_images(sorted(image_files)), 1):
         if verbose:
             print(f"\n[{i}/{len(image_files)}] Processing {image_path.name}...", file=sys.stderr)
         
@@ -168,7 +177,9 @@ def validate_batch(directory: str,
         result = validate_single_label(
             str(image_path),
             ground_truth_path,
-            verbose=False  # Don't duplicate verbose output
+            verbose=False,  # Don't duplicate verbose output
+            validator=validator,
+            image_bytes=image_bytes
         )
         
         results.append(result)
@@ -13,7 +13,7 @@ Environment variables (same as the main app):
     OLLAMA_HOST              default: http://ollama:11434
     OLLAMA_MODEL             default: llama3.2-vision
     OLLAMA_TIMEOUT_SECONDS   default: 15   (short — we retry on timeout)
-    WORKER_POLL_INTERVAL     default: 2    (seconds between empty-queue polls)
+    WORKER_POLL_INTERVAL     default: 2    (seconds per empty-queue wait)
     LOG_LEVEL                default: INFO
 """
 
@@ -68,6 +68,10 @@ from label_validator import LabelValidator  # noqa: E402
 # ---------------------------------------------------------------------------
 
 
+class OCRConnectionError(RuntimeError):
+    """OCR failed at the transport level (timeout, dropped connection)."""
+
+
 def process_job(job: dict, validator: LabelValidator) -> dict:
     """
     Run label validation for a single queued job.
@@ -96,7 +100,8 @@ def process_job(job: dict, validator: LabelValidator) -> dict:
     # completed job.  Raising here causes the worker loop to call queue.fail(),
     # which requeues the job if attempts remain.
     if result.get("status") == "ERROR":
-        raise RuntimeError(result.get("error") or "OCR returned ERROR status")
+        error_cls = OCRConnectionError if result.get("connection_error") else RuntimeError
+        raise error_cls(result.get("error") or "OCR returned ERROR status")
 
     return result
 
@@ -110,6 +115,7 @@ def run_worker() -> None:
     )
 
     queue = QueueManager(db_path=DB_PATH)
+    queue.start_checkpointer()
 
     # We create a single LabelValidator (and therefore a single Ollama client)
     # and reuse it across jobs.  This keeps the model in GPU memory (keep_alive=-1)
@@ -118,15 +124,14 @@ def run_worker() -> None:
 
     while True:
         try:
-            job = queue.dequeue()
+            job = queue.wait_for_job(timeout=POLL_INTERVAL)
         except Exception as exc:
             logger.error(f"[worker] Failed to dequeue: {exc}", exc_info=True)
             time.sleep(POLL_INTERVAL)
             continue
 
         if job is None:
-            # Queue is empty — sleep and poll again
-            time.sleep(POLL_INTERVAL)
+            # Queue stayed empty for POLL_INTERVAL — wait again
             continue
 
         job_id = job["id"]
@@ -156,18 +161,13 @@ def run_worker() -> None:
                 f"[worker] Job {job_id} failed: {err}",
                 exc_info=True,
             )
-            # If it looks like a connection/timeout error, discard the validator
-            # so we rebuild the Ollama client on the next job.
-            err_lower = err.lower()
-            if any(
-                kw in err_lower
-                for kw in ("timeout", "connect", "connection", "read error", "eof")
-            ):
+            # On a connection/timeout error, rebuild the Ollama client so the
+            # next job starts on a fresh connection pool.
+            if isinstance(exc, (OCRConnectionError, ConnectionError, TimeoutError)):
                 logger.warning(
-                    "[worker] Discarding validator due to connection error — "
-                    "will reinitialise for next job"
+                    "[worker] Rebuilding Ollama client due to connection error"
                 )
-                validator = None
+                validator.ocr.reset_client()
 
             queue.fail(job_id, err)
 